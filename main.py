@@ -17,6 +17,7 @@ except ImportError:
 from src.lexer.lexer import Lexer
 from src.parser.parser import Parser
 from src.bytecode.compiler import BytecodeCompiler
+from src.bytecode.optimizer import ConstantFolder
 from src.bytecode.vm import BytecodeVM
 from src.bytecode.opcodes import OPCODE_NAMES
 
@@ -24,7 +25,7 @@ def run_code(source_code, debug=False):
     """
     Run the provided source code using the language pipeline:
     1. Lexer -> Tokenize the source
-    2. Parser -> Parse tokens into AST
+    2. Parser -> Parse tokens into AST (then fold constant expressions)
     3. Compiler -> Compile AST to bytecode
     4. VM -> Execute bytecode
     
@@ -37,6 +38,10 @@ def run_code(source_code, debug=False):
         # Parse the code
         parser = Parser(lexer)
         ast = parser.parse()
+        
+        # Fold constant expressions
+        ast = ConstantFolder().fold(ast)
+        
         if debug:
             print("==== AST ====")
             print(ast)
@@ -75,7 +80,13 @@ def run_code(source_code, debug=False):
         return None
 
 def run_file(file_path, debug=False):
-    """Run code from a file"""
+    """
+    Run code from a file
+    
+    The interpreter is pure Python with no C extensions, so it also runs unchanged
+    under PyPy, whose tracing JIT speeds up long-running programs considerably:
+        pypy3 main.py program.fs
+    """
     try:
         with open(file_path, 'r') as f:
             source_code = f.read()
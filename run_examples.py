@@ -5,6 +5,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.bytecode.compiler import BytecodeCompiler
+from src.bytecode.optimizer import ConstantFolder
 from src.bytecode.vm import BytecodeVM
 from src.bytecode.opcodes import OPCODE_NAMES
 from src.lexer.lexer import Lexer
@@ -14,7 +15,7 @@ def run_code(source_code, debug=False):
     """
     Run the provided source code using the language pipeline:
     1. Lexer -> Tokenize the source
-    2. Parser -> Parse tokens into AST
+    2. Parser -> Parse tokens into AST (then fold constant expressions)
     3. Compiler -> Compile AST to bytecode
     4. VM -> Execute bytecode
     """
@@ -28,6 +29,10 @@ def run_code(source_code, debug=False):
     # Parse the code
     parser = Parser(lexer)
     ast = parser.parse()
+    
+    # Fold constant expressions
+    ast = ConstantFolder().fold(ast)
+    
     if debug:
         print("==== AST ====")
         print(ast)
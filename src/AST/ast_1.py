@@ -297,7 +297,7 @@ class FuncDef(AST):
     name: str
     params: List[str]
     body: AST
-    free_vars: List[str] = None
+    free_vars: Optional[List[str]] = None
     scope_level: int = 0
     env: Optional[Any] = None
     token: Optional[Token] = None
@@ -364,7 +364,7 @@ class ArrayAccess(AST):
     """
     array: AST  
     index: AST  
-    token: any = None  
+    token: Any = None  
     
     def accept(self, visitor):
         """
@@ -390,7 +390,7 @@ class MultiDimArrayAccess(AST):
     """
     array: AST
     indices: List[AST]
-    token: any = None
+    token: Any = None
     
     def accept(self, visitor):
         """
@@ -418,7 +418,7 @@ class ArrayAssign(AST):
     array: AST
     index: AST
     value: AST
-    token: any = None 
+    token: Any = None 
     
     def accept(self, visitor):
         """
@@ -446,7 +446,7 @@ class MultiDimArrayAssign(AST):
     array: AST
     indices: List[AST]
     value: AST
-    token: any = None
+    token: Any = None
     
     def accept(self, visitor):
         """
@@ -470,7 +470,7 @@ class SizeOf(AST):
         token: The original token for error reporting
     """
     expression: AST
-    token: any = None
+    token: Any = None
     
     def accept(self, visitor):
         """
@@ -652,11 +652,11 @@ class AstPrinter(Visitor):
 
     def visit_bin_op(self, node: BinOp) -> str:
         """Format a binary operation node."""
-        return self.parenthesize(node.operator.value, node.left, node.right)
+        return self.parenthesize(str(node.operator.value), node.left, node.right)
 
     def visit_unary_op(self, node: UnaryOp) -> str:
         """Format a unary operation node."""
-        return self.parenthesize(node.operator.value, node.right)
+        return self.parenthesize(str(node.operator.value), node.right)
 
     def visit_integer(self, node: Integer) -> str:
         """Format an integer literal node."""
@@ -6,6 +6,7 @@ This module implements the BytecodeCompiler class, which traverses the FluxScrip
 Features:
 - Compiles expressions, statements, functions, arrays, dictionaries, and control flow
 - Manages constants table and variable names
+- Resolves function locals to slot indices at compile time
 - Supports closures and lambda functions
 - Handles break/continue for loops
 
@@ -15,9 +16,176 @@ Usage:
     # Pass instructions and constants to the VM for execution
 """
 
+import math
+
 from src.AST.ast_1 import *
 from .opcodes import *
 
+# Binary operators and the opcodes they compile to
+BINARY_OPCODES = {
+    '+': ADD,
+    '-': SUBTRACT,
+    '*': MULTIPLY,
+    '/': DIVIDE,
+    '**': EXPONENT,
+    '%': MODULO,
+    '==': EQUAL,
+    '!=': NOT_EQUAL,
+    '<': LESS_THAN,
+    '>': GREATER_THAN,
+    '<=': LESS_EQUAL,
+    '>=': GREATER_EQUAL,
+}
+
+# Literal node types
+LITERAL_NODES = (Integer, Float, Boolean, String)
+
+class LocalResolver(Visitor):
+    """
+    Resolves the local variables of a function body to slot indices.
+    Parameters take the first slots, followed by every name declared with 'let'
+    or used as a for loop variable, in order of appearance.
+    Bodies that create closures (nested functions, lambdas or dictionary literals,
+    which capture the frame's named locals) are left unresolved and keep name-based lookup.
+
+    Attributes:
+        slots: Mapping of local variable names to slot indices
+        captures: Whether the body captures its scope in a closure
+    """
+    def __init__(self):
+        self.slots = {}
+        self.captures = False
+
+    def resolve(self, params, body):
+        """
+        Resolve the locals of a function body.
+        Args:
+            params: List of parameter names
+            body: The function body (AST node)
+        Returns:
+            List of local names indexed by slot, or None if the body captures its scope
+        """
+        self.slots = {}
+        self.captures = False
+        for param in params:
+            self.declare(param)
+        body.accept(self)
+        if self.captures:
+            return None
+        return list(self.slots)
+
+    def declare(self, name):
+        """Assign the next free slot to a local name."""
+        if name not in self.slots:
+            self.slots[name] = len(self.slots)
+
+    def visit_block(self, node):
+        for stmt in node.statements:
+            stmt.accept(self)
+
+    def visit_var_assign(self, node):
+        node.value.accept(self)
+        self.declare(node.name)
+
+    def visit_var_reassign(self, node):
+        node.value.accept(self)
+
+    def visit_bin_op(self, node):
+        node.left.accept(self)
+        node.right.accept(self)
+
+    def visit_unary_op(self, node):
+        node.right.accept(self)
+
+    def visit_if(self, node):
+        node.condition.accept(self)
+        node.then_branch.accept(self)
+        if node.else_branch:
+            node.else_branch.accept(self)
+
+    def visit_while(self, node):
+        node.condition.accept(self)
+        node.body.accept(self)
+
+    def visit_for(self, node):
+        node.start.accept(self)
+        node.end.accept(self)
+        if node.step:
+            node.step.accept(self)
+        self.declare(node.variable)
+        node.body.accept(self)
+
+    def visit_repeat_until(self, node):
+        node.body.accept(self)
+        node.condition.accept(self)
+
+    def visit_match(self, node):
+        node.expression.accept(self)
+        for case in node.cases:
+            case.accept(self)
+
+    def visit_match_case(self, node):
+        node.pattern.accept(self)
+        node.body.accept(self)
+
+    def visit_func_def(self, node):
+        self.captures = True
+
+    def visit_lambda(self, node):
+        self.captures = True
+
+    def visit_dict(self, node):
+        self.captures = True
+
+    def visit_func_call(self, node):
+        node.callee.accept(self)
+        for arg in node.args:
+            arg.accept(self)
+
+    def visit_return(self, node):
+        node.value.accept(self)
+
+    def visit_array(self, node):
+        for elem in node.elements:
+            elem.accept(self)
+
+    def visit_array_access(self, node):
+        node.array.accept(self)
+        node.index.accept(self)
+
+    def visit_array_assign(self, node):
+        node.array.accept(self)
+        node.index.accept(self)
+        node.value.accept(self)
+
+    def visit_multi_dim_array_access(self, node):
+        node.array.accept(self)
+        for index in node.indices:
+            index.accept(self)
+
+    def visit_multi_dim_array_assign(self, node):
+        node.array.accept(self)
+        for index in node.indices:
+            index.accept(self)
+        node.value.accept(self)
+
+    def visit_size_of(self, node):
+        node.expression.accept(self)
+
+    def visit_conditional_expr(self, node):
+        node.condition.accept(self)
+        node.then_expr.accept(self)
+        node.else_expr.accept(self)
+
+    def visit_print(self, node):
+        node.expression.accept(self)
+
+    def visit_break(self, node):
+        pass
+
+    def visit_continue(self, node):
+        pass
+
 class BytecodeCompiler(Visitor):
     """
     Compiles FluxScript AST nodes into bytecode instructions for the VM.
@@ -26,20 +194,25 @@ class BytecodeCompiler(Visitor):
     Attributes:
         instructions: List of generated bytecode instructions
         constants: Table of constants used in the program
+        const_index: Mapping of (type, value) to the index of hashable constants
         var_names: Mapping of variable names to indices
         var_count: Number of variables
         labels: Stack for jump labels
         break_stack: Stack for break statement jump locations
-        continue_stack: Stack for continue statement jump locations
+        continue_stack: Stack for continue statement jump locations, patched at the end of each loop
+        local_slots: Mapping of function local names to slot indices
     """
-    def __init__(self):
+    def __init__(self, local_slots=None, function_name=None):
         self.instructions = []  # List of (opcode, *args)
         self.constants = []     # Constants table
+        self.const_index = {}   # (type, value) to constant index
         self.var_names = {}     # Variable name to index
         self.var_count = 0
         self.labels = []        # For jumps
         self.break_stack = []   # For break/continue
         self.continue_stack = []
+        self.local_slots = local_slots or {}  # Slot-resolved function locals
+        self.function_name = function_name    # Name of the function being compiled
 
     def compile(self, node):
         """
@@ -51,6 +224,7 @@ class BytecodeCompiler(Visitor):
         """
         self.instructions = []
         self.constants = []
+        self.const_index = {}
         self.var_names = {}
         self.var_count = 0
         self.labels = []
@@ -63,12 +237,90 @@ class BytecodeCompiler(Visitor):
     def add_const(self, value):
         """
         Add a constant to the constants table if not already present.
+        Constants are deduplicated by type and value, so 1 and 1.0 get separate entries.
+        Float keys also carry the sign, so -0.0 is not merged into 0.0.
+        Unhashable constants (such as function data) always get a new entry.
         Returns the index of the constant.
         """
-        if value in self.constants:
-            return self.constants.index(value)
+        try:
+            if type(value) is float:
+                key = (float, value, math.copysign(1.0, value))
+            else:
+                key = (type(value), value)
+            idx = self.const_index.get(key)
+        except TypeError:
+            key = idx = None
+        if idx is not None:
+            return idx
         self.constants.append(value)
-        return len(self.constants) - 1
+        idx = len(self.constants) - 1
+        if key is not None:
+            self.const_index[key] = idx
+        return idx
+
+    def compile_function(self, params, body, name=None):
+        """
+        Compile a function body with its own compiler, resolving its locals to slots.
+        Args:
+            params: List of parameter names
+            body: The function body (AST node)
+            name: The function's name (None for lambdas)
+        Returns:
+            Tuple of (compiler, instructions, constants, local_names) where local_names
+            lists the slot-resolved locals, or is None if the body uses name-based lookup
+        """
+        local_names = LocalResolver().resolve(params, body)
+        local_slots = {name: slot for slot, name in enumerate(local_names or [])}
+        compiler = BytecodeCompiler(local_slots, name)
+        instructions, constants = compiler.compile(body)
+        return compiler, instructions, constants, local_names
+
+    def emit_load(self, name):
+        """Emit bytecode to load a variable, using its slot if it is a resolved local."""
+        slot = self.local_slots.get(name)
+        if slot is None:
+            self.instructions.append((LOAD_VAR, name))
+        else:
+            self.instructions.append((LOAD_FAST, slot))
+
+    def emit_store(self, name, opcode=STORE_VAR):
+        """Emit bytecode to store a variable, using its slot if it is a resolved local."""
+        slot = self.local_slots.get(name)
+        if slot is None:
+            self.instructions.append((opcode, name))
+        elif opcode == REASSIGN_VAR:
+            self.instructions.append((REASSIGN_FAST, slot))
+        else:
+            self.instructions.append((STORE_FAST, slot))
+
+    def emit_jump_if_false(self, condition, target=None):
+        """
+        Emit a condition followed by a jump taken when it is false.
+        A 'not' around the condition is compiled away by inverting the jump.
+        Returns the index of the jump, to be patched with patch_jump if no target is given.
+        """
+        return self.emit_conditional_jump(condition, JUMP_IF_FALSE, target)
+
+    def emit_jump_if_true(self, condition, target=None):
+        """
+        Emit a condition followed by a jump taken when it is true.
+        Returns the index of the jump, to be patched with patch_jump if no target is given.
+        """
+        return self.emit_conditional_jump(condition, JUMP_IF_TRUE, target)
+
+    def emit_conditional_jump(self, condition, opcode, target=None):
+        """Emit a condition and a JUMP_IF_FALSE/JUMP_IF_TRUE, inverting it for each 'not' stripped."""
+        while isinstance(condition, UnaryOp) and condition.operator.value == 'not':
+            condition = condition.right
+            opcode = JUMP_IF_TRUE if opcode == JUMP_IF_FALSE else JUMP_IF_FALSE
+        condition.accept(self)
+        idx = len(self.instructions)
+        self.instructions.append((opcode, target))
+        return idx
+
+    def patch_jump(self, idx, target):
+        """Point the jump at the given index to a target, keeping its opcode."""
+        self.instructions[idx] = (self.instructions[idx][0], target)
 
     def visit_integer(self, node):
         """Emit bytecode for an integer literal."""
@@ -91,56 +343,43 @@ class BytecodeCompiler(Visitor):
 
     def visit_var(self, node):
         """Emit bytecode to load a variable's value."""
-        self.instructions.append((LOAD_VAR, node.name))
+        self.emit_load(node.name)
 
     def visit_var_assign(self, node):
         """Emit bytecode for variable declaration and assignment."""
         node.value.accept(self)
         # Push the value back onto the stack after storing
         self.instructions.append((DUP,))  # Duplicate the value
-        self.instructions.append((STORE_VAR, node.name))
+        self.emit_store(node.name)
 
     def visit_var_reassign(self, node):
         """Emit bytecode for variable reassignment."""
         node.value.accept(self)
         # No need for DUP here, since REASSIGN_VAR now pushes the value back onto the stack
-        self.instructions.append((REASSIGN_VAR, node.name))
+        self.emit_store(node.name, REASSIGN_VAR)
 
     def visit_bin_op(self, node):
         """Emit bytecode for a binary operation (e.g., +, -, *, /, etc.)."""
-        node.left.accept(self)
-        node.right.accept(self)
         op = node.operator.value
-        if op == '+':
-            self.instructions.append((ADD,))
-        elif op == '-':
-            self.instructions.append((SUBTRACT,))
-        elif op == '*':
-            self.instructions.append((MULTIPLY,))
-        elif op == '/':
-            self.instructions.append((DIVIDE,))
-        elif op == '**':
-            self.instructions.append((EXPONENT,))
-        elif op == '%':
-            self.instructions.append((MODULO,))
-        elif op == '==':
-            self.instructions.append((EQUAL,))
-        elif op == '!=':
-            self.instructions.append((NOT_EQUAL,))
-        elif op == '<':
-            self.instructions.append((LESS_THAN,))
-        elif op == '>':
-            self.instructions.append((GREATER_THAN,))
-        elif op == '<=':
-            self.instructions.append((LESS_EQUAL,))
-        elif op == '>=':
-            self.instructions.append((GREATER_EQUAL,))
-        elif op == 'and':
-            self.instructions.append((AND,))
-        elif op == 'or':
-            self.instructions.append((OR,))
-        else:
+        if op == 'and' or op == 'or':
+            # Short-circuit: the right operand only runs if the left one doesn't decide the result
+            node.left.accept(self)
+            jump_idx = len(self.instructions)
+            self.instructions.append((JUMP_IF_FALSE_OR_POP if op == 'and' else JUMP_IF_TRUE_OR_POP, None))
+            node.right.accept(self)
+            self.patch_jump(jump_idx, len(self.instructions))
+            return
+        opcode = BINARY_OPCODES.get(op)
+        if opcode is None:
             raise Exception(f"Unknown binary operator: {op}")
+        node.left.accept(self)
+        if (isinstance(node.right, (Integer, Float)) and not isinstance(node.left, LITERAL_NODES)
+                and not (opcode in (DIVIDE, MODULO) and node.right.value == 0)):
+            # A numeric literal right operand is folded into the operator instruction
+            self.instructions.append((BINARY_CONST, opcode, self.add_const(node.right.value)))
+            return
+        node.right.accept(self)
+        self.instructions.append((opcode,))
 
     def visit_unary_op(self, node):
         """Emit bytecode for a unary operation (e.g., -, not)."""
@@ -155,11 +394,8 @@ class BytecodeCompiler(Visitor):
 
     def visit_lambda(self, node):
         """Emit bytecode for a lambda (anonymous function) definition."""
-        # Create a new compiler instance for the lambda body
-        compiler = BytecodeCompiler()
-        
-        # Compile the lambda body separately
-        body_instructions, body_constants = compiler.compile(node.body)
+        # Compile the lambda body separately with its own compiler
+        compiler, body_instructions, body_constants, local_names = self.compile_function(node.params, node.body)
         
         # Add RETURN instruction if not present (to ensure lambda always returns a value)
         if not body_instructions or body_instructions[-1][0] != RETURN:
@@ -179,7 +415,8 @@ class BytecodeCompiler(Visitor):
             'params': node.params,
             'code': body_instructions,
             'consts': body_constants,
-            'free_vars': []  # Will be captured from the closure's env at runtime
+            'free_vars': [],  # Will be captured from the closure's env at runtime
+            'locals': local_names
         })
         
         # Create a closure for this lambda
@@ -192,60 +429,110 @@ class BytecodeCompiler(Visitor):
 
     def visit_if(self, node):
         """Emit bytecode for an if-else statement."""
-        node.condition.accept(self)
-        jmp_false_idx = len(self.instructions)
-        self.instructions.append((JUMP_IF_FALSE, None))
+        jmp_false_idx = self.emit_jump_if_false(node.condition)
         node.then_branch.accept(self)
         if node.else_branch:
             jmp_end_idx = len(self.instructions)
             self.instructions.append((JUMP, None))
-            self.instructions[jmp_false_idx] = (JUMP_IF_FALSE, len(self.instructions))
+            self.patch_jump(jmp_false_idx, len(self.instructions))
             node.else_branch.accept(self)
             self.instructions[jmp_end_idx] = (JUMP, len(self.instructions))
         else:
-            self.instructions[jmp_false_idx] = (JUMP_IF_FALSE, len(self.instructions))
+            self.patch_jump(jmp_false_idx, len(self.instructions))
+
+    def visit_match(self, node):
+        """Emit bytecode for a match statement."""
+        node.expression.accept(self)
+        end_jumps = []
+        if all(isinstance(case.pattern, LITERAL_NODES) for case in node.cases):
+            # Literal patterns are looked up in a value -> body ip table built here,
+            # so matching is one dict lookup whatever the number of cases
+            table = {}
+            table_idx = self.add_const(table)
+            match_idx = len(self.instructions)
+            self.instructions.append((MATCH_DICT, table_idx, None))
+            for case in node.cases:
+                table.setdefault(case.pattern.value, len(self.instructions))  # First case wins
+                case.body.accept(self)
+                end_jumps.append(len(self.instructions))
+                self.instructions.append((JUMP, None))
+            self.instructions[match_idx] = (MATCH_DICT, table_idx, len(self.instructions))
+        else:
+            # Compare the value with each pattern in turn
+            for case in node.cases:
+                self.instructions.append((DUP,))
+                case.pattern.accept(self)
+                self.instructions.append((EQUAL,))
+                next_idx = len(self.instructions)
+                self.instructions.append((JUMP_IF_FALSE, None))
+                self.instructions.append((POP,))
+                case.body.accept(self)
+                end_jumps.append(len(self.instructions))
+                self.instructions.append((JUMP, None))
+                self.patch_jump(next_idx, len(self.instructions))
+            self.instructions.append((POP,))  # No case matched
+        for idx in end_jumps:
+            self.instructions[idx] = (JUMP, len(self.instructions))
 
     def visit_while(self, node):
         """Emit bytecode for a while loop."""
-        start_idx = len(self.instructions)
-        node.condition.accept(self)
-        jmp_false_idx = len(self.instructions)
-        self.instructions.append((JUMP_IF_FALSE, None))
-        self.continue_stack.append(start_idx)
+        # The condition is tested at the bottom of the loop, so each iteration ends
+        # in a single conditional jump back to the body. The loop is entered by
+        # jumping to the test.
+        entry_idx = len(self.instructions)
+        self.instructions.append((JUMP, None))
+        body_idx = len(self.instructions)
+        self.continue_stack.append([])
         self.break_stack.append([])
         node.body.accept(self)
-        self.instructions.append((JUMP, start_idx))
-        self.instructions[jmp_false_idx] = (JUMP_IF_FALSE, len(self.instructions))
+        condition_idx = len(self.instructions)
+        self.instructions[entry_idx] = (JUMP, condition_idx)
+        self.emit_jump_if_true(node.condition, body_idx)
         for idx in self.break_stack.pop():
             self.instructions[idx] = (JUMP, len(self.instructions))
-        self.continue_stack.pop()
+        for idx in self.continue_stack.pop():
+            self.instructions[idx] = (JUMP, condition_idx)
+
+    def visit_repeat_until(self, node):
+        """Emit bytecode for a repeat-until loop."""
+        # The body runs first, then the loop jumps back while the condition is false
+        body_idx = len(self.instructions)
+        self.continue_stack.append([])
+        self.break_stack.append([])
+        node.body.accept(self)
+        condition_idx = len(self.instructions)
+        self.emit_jump_if_false(node.condition, body_idx)
+        for idx in self.break_stack.pop():
+            self.instructions[idx] = (JUMP, len(self.instructions))
+        for idx in self.continue_stack.pop():
+            self.instructions[idx] = (JUMP, condition_idx)
 
     def visit_for(self, node):
         """Emit bytecode for a for loop."""
         # for (let i = start to end step step) { body }
+        # SETUP_FOR turns the bounds into a counter held by the frame and FOR_ITER
+        # stores each value straight into the loop variable.
         node.start.accept(self)
-        self.instructions.append((STORE_VAR, node.variable))
-        start_idx = len(self.instructions)
-        self.instructions.append((LOAD_VAR, node.variable))
         node.end.accept(self)
-        self.instructions.append((GREATER_THAN,))
-        jmp_false_idx = len(self.instructions)
-        self.instructions.append((JUMP_IF_TRUE, None))
-        self.continue_stack.append(start_idx)
-        self.break_stack.append([])
-        node.body.accept(self)
-        self.instructions.append((LOAD_VAR, node.variable))
         if node.step:
             node.step.accept(self)
         else:
             self.instructions.append((LOAD_CONST, self.add_const(1)))
-        self.instructions.append((ADD,))
-        self.instructions.append((STORE_VAR, node.variable))
-        self.instructions.append((JUMP, start_idx))
-        self.instructions[jmp_false_idx] = (JUMP_IF_TRUE, len(self.instructions))
+        self.instructions.append((SETUP_FOR,))
+        loop_idx = len(self.instructions)
+        slot = self.local_slots.get(node.variable)
+        self.instructions.append((FOR_ITER, None, node.variable, slot))
+        self.continue_stack.append([])
+        self.break_stack.append([])
+        node.body.accept(self)
+        self.instructions.append((JUMP, loop_idx))
+        exit_idx = len(self.instructions)
+        self.instructions[loop_idx] = (FOR_ITER, exit_idx, node.variable, slot)
+        self.instructions.append((POP_FOR,))
         for idx in self.break_stack.pop():
-            self.instructions[idx] = (JUMP, len(self.instructions))
-        self.continue_stack.pop()
+            self.instructions[idx] = (JUMP, exit_idx)  # Break still finishes the loop
+        for idx in self.continue_stack.pop():
+            self.instructions[idx] = (JUMP, loop_idx)
 
     def visit_break(self, node):
         """Emit bytecode for a break statement in a loop."""
@@ -254,15 +541,13 @@ class BytecodeCompiler(Visitor):
 
     def visit_continue(self, node):
         """Emit bytecode for a continue statement in a loop."""
-        self.instructions.append((JUMP, self.continue_stack[-1]))
+        self.continue_stack[-1].append(len(self.instructions))
+        self.instructions.append((JUMP, None))
 
     def visit_func_def(self, node):
         """Emit bytecode for a function definition."""
-        # Create a new compiler instance for the function body
-        compiler = BytecodeCompiler()
-        
-        # Compile the function body separately
-        body_instructions, body_constants = compiler.compile(node.body)
+        # Compile the function body separately with its own compiler
+        compiler, body_instructions, body_constants, local_names = self.compile_function(node.params, node.body, node.name)
         
         # Store function data as a constant
         idx = self.add_const({
@@ -270,7 +555,8 @@ class BytecodeCompiler(Visitor):
             'params': node.params,
             'code': body_instructions,
             'consts': body_constants,
-            'free_vars': node.free_vars or []
+            'free_vars': node.free_vars or [],
+            'locals': local_names
         })
         
         # Add instruction to define the function
@@ -306,7 +592,17 @@ class BytecodeCompiler(Visitor):
 
     def visit_return(self, node):
         """Emit bytecode for a return statement."""
-        node.value.accept(self)
+        value = node.value
+        if (isinstance(value, FuncCall) and isinstance(value.callee, Var)
+                and value.callee.name == self.function_name):
+            # Self tail call: the VM may restart the current frame instead of nesting
+            # a new one, and otherwise runs it as an ordinary call followed by RETURN
+            value.callee.accept(self)
+            for arg in value.args:
+                arg.accept(self)
+            self.instructions.append((TAIL_CALL, len(value.args)))
+        else:
+            value.accept(self)
         self.instructions.append((RETURN,))
 
     def visit_array(self, node):
@@ -322,11 +618,8 @@ class BytecodeCompiler(Visitor):
             
             # If the value is a lambda function, we need special handling to ensure proper closure capture
             if isinstance(value, Lambda):
-                # Create a new compiler instance for the lambda body
-                lambda_compiler = BytecodeCompiler()
-                
-                # Compile the lambda body separately
-                body_instructions, body_constants = lambda_compiler.compile(value.body)
+                # Compile the lambda body separately with its own compiler
+                lambda_compiler, body_instructions, body_constants, local_names = self.compile_function(value.params, value.body)
                 
                 # Add RETURN instruction if not present
                 if not body_instructions or body_instructions[-1][0] != RETURN:
@@ -343,7 +636,8 @@ class BytecodeCompiler(Visitor):
                     'params': value.params,
                     'code': body_instructions,
                     'consts': body_constants,
-                    'free_vars': []  # Will be captured from the closure's env at runtime
+                    'free_vars': [],  # Will be captured from the closure's env at runtime
+                    'locals': local_names
                 })
                 
                 # Load the lambda onto the stack
@@ -22,6 +22,9 @@ LOAD_FALSE = 3   # Load boolean False onto the stack
 LOAD_VAR = 10    # Load a variable value onto the stack
 STORE_VAR = 11   # Store top of stack in a variable
 REASSIGN_VAR = 12 # Reassign a value to an existing variable
+LOAD_FAST = 13   # Load a function local from its slot onto the stack
+STORE_FAST = 14  # Store top of stack in a function local slot
+REASSIGN_FAST = 15 # Reassign a function local slot, or the enclosing variable if unassigned
 
 # Arithmetic Operations
 ADD = 20         # Add top two values on stack
@@ -31,6 +34,7 @@ DIVIDE = 23      # Divide second top value by top value
 EXPONENT = 24    # Raise second top value to power of top value
 MODULO = 25      # Modulo operation (remainder)
 NEGATE = 26      # Negate top value on stack
+BINARY_CONST = 27 # Apply a binary operator to the top value and a numeric constant
 
 # Comparison Operations
 EQUAL = 30       # Check if top two values are equal
@@ -49,12 +53,19 @@ NOT = 42         # Logical NOT of top value
 JUMP = 50        # Unconditional jump to instruction
 JUMP_IF_FALSE = 51 # Jump to instruction if top of stack is false
 JUMP_IF_TRUE = 52  # Jump to instruction if top of stack is true
+SETUP_FOR = 53     # Start a for loop over the start, end and step on the stack
+FOR_ITER = 54      # Store the next for loop value, or jump when the loop is done
+POP_FOR = 55       # Finish the innermost for loop
+JUMP_IF_FALSE_OR_POP = 56 # Jump if top of stack is false, keeping it; otherwise pop it
+JUMP_IF_TRUE_OR_POP = 57  # Jump if top of stack is true, keeping it; otherwise pop it
+MATCH_DICT = 58    # Jump to the case a value selects in a table of literal patterns
 
 # Functions
 DEFINE_FUNC = 60    # Define a function
 LOAD_LAMBDA = 63    # Load an anonymous function (lambda)
 CALL_FUNC = 61      # Call a function
 DICT_FUNC_CALL = 64 # Call a function stored in a dictionary
+TAIL_CALL = 65      # Call a function and return its result
 RETURN = 62         # Return from function call
 
 # Data Structures
@@ -84,6 +95,9 @@ OPCODE_NAMES = {
     LOAD_VAR: "LOAD_VAR",
     STORE_VAR: "STORE_VAR",
     REASSIGN_VAR: "REASSIGN_VAR",
+    LOAD_FAST: "LOAD_FAST",
+    STORE_FAST: "STORE_FAST",
+    REASSIGN_FAST: "REASSIGN_FAST",
     ADD: "ADD",
     SUBTRACT: "SUBTRACT",
     MULTIPLY: "MULTIPLY",
@@ -91,6 +105,7 @@ OPCODE_NAMES = {
     EXPONENT: "EXPONENT",
     MODULO: "MODULO",
     NEGATE: "NEGATE",
+    BINARY_CONST: "BINARY_CONST",
     EQUAL: "EQUAL",
     NOT_EQUAL: "NOT_EQUAL",
     LESS_THAN: "LESS_THAN",
@@ -103,10 +118,17 @@ OPCODE_NAMES = {
     JUMP: "JUMP",
     JUMP_IF_FALSE: "JUMP_IF_FALSE",
     JUMP_IF_TRUE: "JUMP_IF_TRUE",
+    SETUP_FOR: "SETUP_FOR",
+    FOR_ITER: "FOR_ITER",
+    POP_FOR: "POP_FOR",
+    JUMP_IF_FALSE_OR_POP: "JUMP_IF_FALSE_OR_POP",
+    JUMP_IF_TRUE_OR_POP: "JUMP_IF_TRUE_OR_POP",
+    MATCH_DICT: "MATCH_DICT",
     DEFINE_FUNC: "DEFINE_FUNC",
     LOAD_LAMBDA: "LOAD_LAMBDA",
     CALL_FUNC: "CALL_FUNC",
     DICT_FUNC_CALL: "DICT_FUNC_CALL",
+    TAIL_CALL: "TAIL_CALL",
     RETURN: "RETURN",
     BUILD_ARRAY: "BUILD_ARRAY",
     BUILD_DICT: "BUILD_DICT",
@@ -0,0 +1,251 @@
+"""
+FluxScript AST Optimizer Module
+
+This module implements compile-time optimizations that run on the AST between the parser
+and the BytecodeCompiler.
+
+Features:
+- Folds arithmetic, comparison and logical operations on literal operands
+- Folds unary operations on literal operands
+- Collapses if statements and conditional expressions with a literal condition
+
+Usage:
+    ast = Parser(Lexer(source_code)).parse()
+    ast = ConstantFolder().fold(ast)
+    instructions, constants = BytecodeCompiler().compile(ast)
+"""
+
+import operator
+
+from src.AST.ast_1 import *
+
+# Literal node types the folder evaluates at compile time
+LITERALS = (Integer, Float, Boolean, String)
+
+# Largest exponent folded at compile time, so huge powers are left to the VM
+MAX_FOLDED_EXPONENT = 64
+
+BINARY_FOLDS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '**': operator.pow,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+    'and': lambda left, right: left and right,
+    'or': lambda left, right: left or right,
+}
+
+def make_literal(value):
+    """
+    Wrap a folded Python value in the matching literal node.
+    Returns None if the value has no literal node type.
+    """
+    # bool is checked first because it is a subclass of int
+    if isinstance(value, bool):
+        return Boolean(value)
+    if isinstance(value, int):
+        return Integer(value)
+    if isinstance(value, float):
+        return Float(value)
+    if isinstance(value, str):
+        return String(value)
+    return None
+
+class ConstantFolder(Visitor):
+    """
+    Replaces operations on literal operands with their result.
+    Each visit method returns the node that should take the visited node's place.
+    Operations that would fail at runtime (division by zero, mismatched types) are
+    left in place so the VM still reports the error when they are executed.
+    """
+    def fold(self, node):
+        """
+        Fold the constant expressions of an AST.
+        Args:
+            node: The root AST node
+        Returns:
+            The folded AST node
+        """
+        return node.accept(self)
+
+    def visit_bin_op(self, node):
+        node.left = node.left.accept(self)
+        node.right = node.right.accept(self)
+        if not (isinstance(node.left, LITERALS) and isinstance(node.right, LITERALS)):
+            return node
+
+        op = node.operator.value
+        fold = BINARY_FOLDS.get(op)
+        if fold is None:
+            return node
+        left = node.left.value
+        right = node.right.value
+
+        if op in ('/', '%') and right == 0:
+            return node
+        if op == '**' and (not isinstance(right, (int, float)) or abs(right) > MAX_FOLDED_EXPONENT):
+            return node
+        if op == '*' and (isinstance(left, str) or isinstance(right, str)):
+            return node  # Keep string repetition out of the constants table
+
+        try:
+            value = fold(left, right)
+        except (TypeError, ValueError, ArithmeticError):
+            return node
+        return make_literal(value) or node
+
+    def visit_unary_op(self, node):
+        node.right = node.right.accept(self)
+        if not isinstance(node.right, LITERALS):
+            return node
+
+        op = node.operator.value
+        if op == 'not':
+            return Boolean(not node.right.value)
+        if op == '-' and isinstance(node.right, (Integer, Float)):
+            return make_literal(-node.right.value)
+        return node
+
+    def visit_integer(self, node):
+        return node
+
+    def visit_float(self, node):
+        return node
+
+    def visit_boolean(self, node):
+        return node
+
+    def visit_string(self, node):
+        return node
+
+    def visit_var(self, node):
+        return node
+
+    def visit_var_assign(self, node):
+        node.value = node.value.accept(self)
+        return node
+
+    def visit_var_reassign(self, node):
+        node.value = node.value.accept(self)
+        return node
+
+    def visit_block(self, node):
+        node.statements = [stmt.accept(self) for stmt in node.statements]
+        return node
+
+    def visit_if(self, node):
+        node.condition = node.condition.accept(self)
+        node.then_branch = node.then_branch.accept(self)
+        if node.else_branch:
+            node.else_branch = node.else_branch.accept(self)
+
+        # Keep only the branch a literal condition selects
+        if isinstance(node.condition, LITERALS):
+            if node.condition.value:
+                return node.then_branch
+            return node.else_branch or Block([])
+        return node
+
+    def visit_while(self, node):
+        node.condition = node.condition.accept(self)
+        node.body = node.body.accept(self)
+        return node
+
+    def visit_for(self, node):
+        node.start = node.start.accept(self)
+        node.end = node.end.accept(self)
+        if node.step:
+            node.step = node.step.accept(self)
+        node.body = node.body.accept(self)
+        return node
+
+    def visit_repeat_until(self, node):
+        node.body = node.body.accept(self)
+        node.condition = node.condition.accept(self)
+        return node
+
+    def visit_match(self, node):
+        node.expression = node.expression.accept(self)
+        node.cases = [case.accept(self) for case in node.cases]
+        return node
+
+    def visit_match_case(self, node):
+        node.pattern = node.pattern.accept(self)
+        node.body = node.body.accept(self)
+        return node
+
+    def visit_func_def(self, node):
+        node.body = node.body.accept(self)
+        return node
+
+    def visit_func_call(self, node):
+        node.callee = node.callee.accept(self)
+        node.args = [arg.accept(self) for arg in node.args]
+        return node
+
+    def visit_lambda(self, node):
+        node.body = node.body.accept(self)
+        return node
+
+    def visit_return(self, node):
+        node.value = node.value.accept(self)
+        return node
+
+    def visit_array(self, node):
+        node.elements = [elem.accept(self) for elem in node.elements]
+        return node
+
+    def visit_array_access(self, node):
+        node.array = node.array.accept(self)
+        node.index = node.index.accept(self)
+        return node
+
+    def visit_multi_dim_array_access(self, node):
+        node.array = node.array.accept(self)
+        node.indices = [index.accept(self) for index in node.indices]
+        return node
+
+    def visit_array_assign(self, node):
+        node.array = node.array.accept(self)
+        node.index = node.index.accept(self)
+        node.value = node.value.accept(self)
+        return node
+
+    def visit_multi_dim_array_assign(self, node):
+        node.array = node.array.accept(self)
+        node.indices = [index.accept(self) for index in node.indices]
+        node.value = node.value.accept(self)
+        return node
+
+    def visit_size_of(self, node):
+        node.expression = node.expression.accept(self)
+        return node
+
+    def visit_dict(self, node):
+        node.pairs = [(key.accept(self), value.accept(self)) for key, value in node.pairs]
+        return node
+
+    def visit_conditional_expr(self, node):
+        node.condition = node.condition.accept(self)
+        node.then_expr = node.then_expr.accept(self)
+        node.else_expr = node.else_expr.accept(self)
+        if isinstance(node.condition, LITERALS):
+            return node.then_expr if node.condition.value else node.else_expr
+        return node
+
+    def visit_print(self, node):
+        node.expression = node.expression.accept(self)
+        return node
+
+    def visit_break(self, node):
+        return node
+
+    def visit_continue(self, node):
+        return node
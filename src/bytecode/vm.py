@@ -6,6 +6,7 @@ The VM supports stack-based execution, function calls, closures, arrays, diction
 
 Features:
 - Stack-based execution model
+- Single dispatch loop over decoded opcode and operand arrays
 - Support for closures and lexical scoping
 - Built-in functions for string, array, and number operations
 - Error handling for runtime exceptions
@@ -16,7 +17,19 @@ Usage:
     result = vm.run_program(instructions, constants)
 """
 
-from .opcodes import *
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Imported by name rather than with *, which mypyc does not support
+from .opcodes import (
+    LOAD_CONST, LOAD_TRUE, LOAD_FALSE, LOAD_VAR, STORE_VAR, REASSIGN_VAR, LOAD_FAST, STORE_FAST,
+    REASSIGN_FAST, ADD, SUBTRACT, MULTIPLY, DIVIDE, EXPONENT, MODULO, NEGATE, BINARY_CONST,
+    EQUAL, NOT_EQUAL, LESS_THAN, GREATER_THAN, LESS_EQUAL, GREATER_EQUAL, AND, OR, NOT, JUMP,
+    JUMP_IF_FALSE, JUMP_IF_TRUE, SETUP_FOR, FOR_ITER, POP_FOR, JUMP_IF_FALSE_OR_POP,
+    JUMP_IF_TRUE_OR_POP, MATCH_DICT, DEFINE_FUNC, LOAD_LAMBDA, CALL_FUNC, DICT_FUNC_CALL,
+    TAIL_CALL, RETURN, BUILD_ARRAY, BUILD_DICT, ARRAY_ACCESS, ARRAY_ASSIGN, GET_SIZE,
+    MULTI_DIM_ACCESS, MULTI_DIM_ASSIGN, PRINT, POP, DUP, HALT, OPCODE_NAMES
+)
 
 class VMError(Exception):
     """Base class for VM errors"""
@@ -38,10 +51,175 @@ class InvalidOperationError(VMError):
     """Raised when an operation is invalid for the given operands"""
     pass
 
-class ReturnException(Exception):
-    """Used to handle return statements in functions"""
-    def __init__(self, value):
-        self.value = value
+class CallDepthError(VMError):
+    """Raised when function calls nest deeper than MAX_CALL_DEPTH"""
+    pass
+
+# Deepest nesting of function calls before CallDepthError is raised
+MAX_CALL_DEPTH = 100000
+
+# Binary operator handlers, one per opcode, each taking (left, right)
+def _binary_add(left, right):
+    try:
+        return left + right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot add {left} and {right}: {e}")
+
+def _binary_subtract(left, right):
+    try:
+        return left - right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot subtract {right} from {left}: {e}")
+
+def _binary_multiply(left, right):
+    try:
+        return left * right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot multiply {left} and {right}: {e}")
+
+def _binary_divide(left, right):
+    if right == 0:
+        raise DivisionByZeroError("Division by zero")
+    try:
+        return left / right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot divide {left} by {right}: {e}")
+
+def _binary_modulo(left, right):
+    if right == 0:
+        raise DivisionByZeroError("Modulo by zero")
+    try:
+        return left % right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot compute {left} modulo {right}: {e}")
+
+def _binary_exponent(left, right):
+    try:
+        return left ** right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot raise {left} to the power of {right}: {e}")
+
+def _binary_equal(left, right):
+    return left == right
+
+def _binary_not_equal(left, right):
+    return left != right
+
+def _binary_less_than(left, right):
+    try:
+        return left < right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot compare {left} < {right}: {e}")
+
+def _binary_greater_than(left, right):
+    try:
+        return left > right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot compare {left} > {right}: {e}")
+
+def _binary_less_equal(left, right):
+    try:
+        return left <= right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot compare {left} <= {right}: {e}")
+
+def _binary_greater_equal(left, right):
+    try:
+        return left >= right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot compare {left} >= {right}: {e}")
+
+def _binary_divide_by_const(left, right):
+    try:
+        return left / right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot divide {left} by {right}: {e}")
+
+def _binary_modulo_by_const(left, right):
+    try:
+        return left % right
+    except (TypeError, ValueError) as e:
+        raise InvalidOperationError(f"Cannot compute {left} modulo {right}: {e}")
+
+BINARY_OPS = {
+    ADD: _binary_add,
+    SUBTRACT: _binary_subtract,
+    MULTIPLY: _binary_multiply,
+    DIVIDE: _binary_divide,
+    MODULO: _binary_modulo,
+    EXPONENT: _binary_exponent,
+    EQUAL: _binary_equal,
+    NOT_EQUAL: _binary_not_equal,
+    LESS_THAN: _binary_less_than,
+    GREATER_THAN: _binary_greater_than,
+    LESS_EQUAL: _binary_less_equal,
+    GREATER_EQUAL: _binary_greater_equal,
+}
+
+# Handlers for BINARY_CONST, whose right operand is a numeric constant;
+# the compiler never emits a zero divisor, so division skips the zero check
+CONST_BINARY_OPS = dict(BINARY_OPS)
+CONST_BINARY_OPS[DIVIDE] = _binary_divide_by_const
+CONST_BINARY_OPS[MODULO] = _binary_modulo_by_const
+
+# Marks a local slot that has not been assigned yet
+UNBOUND = object()
+
+def stringify(value: Any) -> str:
+    """
+    Convert a value to the text PRINT and to_string produce.
+    Strings, the common case, are returned as they are.
+    """
+    if type(value) is str:
+        return value
+    return str(value)
+
+class _StepRange:
+    """
+    Iterator over the values of a for loop with non-integer bounds or step, from start
+    to end inclusive, counting down when the step is negative.
+    Once exhausted, current holds the first value past the end.
+    """
+    __slots__ = ("current", "end", "step", "start")
+    
+    def __init__(self, start: Any, end: Any, step: Any) -> None:
+        self.start = start
+        self.current = start
+        self.end = end
+        self.step = step
+    
+    def __iter__(self) -> "_StepRange":
+        return self
+    
+    def __next__(self) -> Any:
+        current = self.current
+        try:
+            if (current < self.end) if self.step < 0 else (current > self.end):
+                raise StopIteration
+            self.current = current + self.step
+        except TypeError as e:
+            raise InvalidOperationError(f"Cannot loop from {self.start} to {self.end} step {self.step}: {e}")
+        return current
+    
+    def after(self) -> Any:
+        return self.current
+
+def for_range(start: Any, end: Any, step: Any) -> Tuple[Iterator[Any], Callable[[], Any]]:
+    """
+    Return an iterator over the values of a for loop from start to end inclusive,
+    and a function giving the value the loop variable is left with once it is exhausted:
+    one step past the last value, or start if the loop does not run.
+    Integer loops run on a native range; anything else is stepped by _StepRange.
+    """
+    if type(start) is int and type(end) is int and type(step) is int and step != 0:
+        if step > 0:
+            values = range(start, end + 1, step)
+        else:
+            values = range(start, end - 1, step)
+        after = start + len(values) * step
+        return iter(values), lambda: after
+    counter = _StepRange(start, end, step)
+    return counter, counter.after
 
 class Closure:
     """
@@ -52,13 +230,23 @@ class Closure:
         code: Bytecode instructions for the function
         consts: Constants table for the function
         env: Captured environment (variables from outer scopes)
+        local_names: Names of the slot-resolved locals, indexed by slot (None if unresolved)
+        slot_index: Mapping of slot-resolved local names to their slot
+        execute: Python implementation of a built-in function (unset for compiled functions)
     """
-    def __init__(self, name, params, code, consts, env=None):
+    __slots__ = ("name", "params", "code", "consts", "env", "local_names", "slot_index", "execute")
+    
+    execute: Callable[[list], Any]
+    
+    def __init__(self, name: str, params: List[str], code: List[tuple], consts: list,
+                 env: Optional[Dict[str, Any]] = None, local_names: Optional[List[str]] = None) -> None:
         self.name = name
         self.params = params
         self.code = code
         self.consts = consts
         self.env = env or {}
+        self.local_names = local_names
+        self.slot_index = {name: slot for slot, name in enumerate(local_names)} if local_names else None
     
     def __repr__(self):
         return f"<Closure {self.name}>"
@@ -70,77 +258,126 @@ class Frame:
         ip: Instruction pointer
         closure: Current function closure
         locals: Local variables
+        slots: Slot-resolved local variables (None if the function has none)
         stack: Operand stack
+        loops: Active for loops, innermost last, each as an exit value function
+            followed by the loop's iterator
         parent: Parent frame (for nested calls)
     """
-    def __init__(self, ip=0, closure=None, args=None, parent=None):
+    __slots__ = ("ip", "closure", "locals", "slots", "stack", "loops", "parent")
+    
+    def __init__(self, ip: int = 0, closure: Optional[Closure] = None, args: Optional[list] = None,
+                 parent: Optional["Frame"] = None) -> None:
         self.ip = ip                  # Instruction pointer
         self.closure = closure        # Current function closure
-        self.locals = {}              # Local variables
-        self.stack = []               # Operand stack
+        self.locals: Dict[str, Any] = {}           # Local variables
+        self.slots: Optional[List[Any]] = None     # Slot-resolved local variables
+        self.stack: List[Any] = []                 # Operand stack
+        self.loops: List[Any] = []                 # Active for loops
         self.parent = parent          # Parent frame
         
-        # Set up arguments in local variables if this is a function frame
+        if closure and closure.local_names:
+            self.slots = [UNBOUND] * len(closure.local_names)
         if closure and args:
-            for i, param in enumerate(closure.params):
-                if i < len(args):
-                    self.locals[param] = args[i]
-                else:
-                    self.locals[param] = None  # Optional parameters default to None
+            self.bind_args(args)
 
-    def lookup_var(self, name):
+    def bind_args(self, args: list) -> None:
         """
-        Look up a variable in the current scope or parent scopes.
-        Returns the variable value or raises UndefinedVariableError.
+        Bind call arguments to the parameters of this frame's closure.
+        Arguments are written in one slice or dict update rather than per parameter.
         """
-        # First check locals
-        if name in self.locals:
-            return self.locals[name]
+        closure = self.closure
+        if closure is None:
+            return
+        params = closure.params
+        count = len(params)
+        if len(args) < count:
+            args = list(args) + [None] * (count - len(args))  # Optional parameters default to None
         
-        # Then check closure environment
-        if self.closure and name in self.closure.env:
-            return self.closure.env[name]
+        if self.slots is not None:
+            # Parameters take the first slots
+            self.slots[:count] = args[:count]
         
-        # Finally check parent frame
-        if self.parent:
-            try:
-                return self.parent.lookup_var(name)
-            except UndefinedVariableError:
-                # If not found in parent, check if we have a closure
-                if self.closure and self.closure.env:
-                    # Try to find the variable in the closure's environment
-                    if name in self.closure.env:
-                        return self.closure.env[name]
-                raise UndefinedVariableError(f"Undefined variable: {name}")
+        # Set up arguments in local variables if this is a function frame
+        else:
+            self.locals.update(zip(params, args))
+
+    def holds_only_arguments(self) -> bool:
+        """
+        Return True if this frame binds nothing but its parameters and its function's
+        own name, which a new activation of the same function shadows.
+        """
+        closure = self.closure
+        if closure is None:
+            return False
+        params = closure.params
+        if self.slots is not None:
+            for value in self.slots[len(params):]:
+                if value is not UNBOUND:
+                    return False
+        for name in self.locals:
+            if name != closure.name and name not in params:
+                return False
+        return True
+
+    def lookup_slot(self, name: str) -> Optional[int]:
+        """
+        Return the slot index holding a bound local of this frame, or None.
+        """
+        closure = self.closure
+        if self.slots is not None and closure is not None and closure.slot_index is not None:
+            slot = closure.slot_index.get(name)
+            if slot is not None and self.slots[slot] is not UNBOUND:
+                return slot
+        return None
+
+    def lookup_var(self, name: str) -> Any:
+        """
+        Look up a variable in the current scope or parent scopes.
+        Each frame is searched in turn: locals, slots, then the closure environment.
+        Returns the variable value or raises UndefinedVariableError.
+        """
+        container, key = self.resolve_var(name)
+        return container[key]
+    
+    def resolve_var(self, name: str) -> Tuple[Any, Any]:
+        """
+        Find the scope holding a variable, searching in the same order as lookup_var.
+        Returns a (container, key) pair such that container[key] is the variable's
+        current value, or raises UndefinedVariableError.
+        """
+        frame: Optional[Frame] = self
+        while frame is not None:
+            if name in frame.locals:
+                return frame.locals, name
+            
+            if frame.slots is not None:
+                slot = frame.lookup_slot(name)
+                if slot is not None:
+                    return frame.slots, slot
+            
+            closure = frame.closure
+            if closure and name in closure.env:
+                return closure.env, name
+            
+            frame = frame.parent
         
         raise UndefinedVariableError(f"Undefined variable: {name}")
     
-    def assign_var(self, name, value):
+    def assign_var(self, name: str, value: Any) -> None:
         """
         Assign a value to a variable in the appropriate scope.
+        Variables that are not defined anywhere are defined in the outermost frame.
         """
-        # First try locals
-        if name in self.locals:
-            self.locals[name] = value
+        try:
+            container, key = self.resolve_var(name)
+        except UndefinedVariableError:
+            frame = self
+            while frame.parent is not None:
+                frame = frame.parent
+            frame.locals[name] = value
             return
-        
-        # Then check closure environment
-        if self.closure and name in self.closure.env:
-            self.closure.env[name] = value
-            return
-        
-        # Then try parent frame
-        if self.parent:
-            try:
-                self.parent.assign_var(name, value)
-                return
-            except UndefinedVariableError:
-                # If not found in parent, define it in the current scope
-                self.locals[name] = value
-                return
-        
-        # If not found anywhere, define it in the current scope
-        self.locals[name] = value
+        container[key] = value
 
 class BytecodeVM:
     """
@@ -151,6 +388,8 @@ class BytecodeVM:
         functions: Global function definitions
         debug: Enable debug output
         running: VM running state
+        decoded: Cache of decoded (ops, args) arrays per instruction list
+        scope_version: Bumped when a closure environment is replaced, invalidating cached lookups
     """
     def __init__(self, debug=False):
         self.global_frame = Frame()   # Global execution frame
@@ -158,6 +397,8 @@ class BytecodeVM:
         self.functions = {}           # Global function definitions
         self.debug = debug
         self.running = False
+        self.decoded = {}             # Decoded instruction arrays
+        self.scope_version = 0        # Version of the closure environments
         
         # Add built-in functions
         self._add_builtins()
@@ -170,7 +411,7 @@ class BytecodeVM:
         def to_string_func(args):
             if len(args) != 1:
                 raise InvalidOperationError("to_string requires exactly one argument")
-            return str(args[0])
+            return stringify(args[0])
         
         # to_number function: converts a string to a number
         def to_number_func(args):
@@ -288,7 +529,7 @@ class BytecodeVM:
                 name=name,
                 params=params,
                 code=[],  # Empty code as this is a built-in function
-                consts={},
+                consts=[],
                 env={}
             )
             
@@ -298,9 +539,48 @@ class BytecodeVM:
             # Add it to the global frame
             self.global_frame.locals[name] = closure
     
-    def execute(self, instructions, constants):
+    def _decode(self, instructions: List[tuple]) -> Tuple[List[int], list]:
+        """
+        Split a list of (opcode, *args) instructions into parallel opcode and operand arrays.
+        Instructions with a single argument store it directly, instructions with several
+        arguments store them as a tuple and instructions without arguments store None.
+        Decoded code is cached per instruction list, so function bodies are only decoded once.
+        Args:
+            instructions: List of bytecode instructions
+        Returns:
+            Tuple of (ops, args)
+        """
+        cached = self.decoded.get(id(instructions))
+        if cached is not None and cached[0] is instructions:
+            return cached[1], cached[2]
+
+        ops = []
+        args = []
+        for instruction in instructions:
+            ops.append(instruction[0])
+            if len(instruction) == 2:
+                args.append(instruction[1])
+            elif len(instruction) > 2:
+                args.append(instruction[1:])
+            else:
+                args.append(None)
+
+        # Keep a reference to the instruction list so its id stays unique while cached
+        self.decoded[id(instructions)] = (instructions, ops, args)
+        return ops, args
+
+    def execute(self, instructions: List[tuple], constants: list) -> Any:
         """
         Execute a bytecode program.
+        The instructions are decoded once into parallel opcode and operand arrays and
+        interpreted by a single dispatch loop that keeps the frame, stack and instruction
+        pointer in local variables.
+        Function calls don't recurse into execute: the caller's state is saved on an
+        explicit call stack and the loop switches to the callee's frame and code, so call
+        depth is limited by MAX_CALL_DEPTH rather than Python's recursion limit.
+        Names that LOAD_VAR finds outside the frame's own locals are cached per
+        instruction, so a call site that keeps calling the same outer function
+        resolves it once per frame instead of walking the scope chain every time.
         Args:
             instructions: List of bytecode instructions
             constants: Constants table
@@ -308,585 +588,522 @@ class BytecodeVM:
             The result of execution (top of stack or global variables)
         """
         self.running = True
-        last_value = None
-        
-        if self.current_frame.ip == 0:  # Only reset the frame if we're starting from the beginning
-            self.current_frame.ip = 0
-        
-        while self.running and self.current_frame.ip < len(instructions):
-            instruction = instructions[self.current_frame.ip]
-            opcode = instruction[0]
-            
-            if self.debug:
-                stack_repr = ", ".join(str(x) for x in self.current_frame.stack)
-                print(f"IP: {self.current_frame.ip}, Opcode: {OPCODE_NAMES.get(opcode, opcode)}, Stack: [{stack_repr}]")
-                if len(self.current_frame.locals) > 0:
-                    print(f"Current locals: {self.current_frame.locals}")
-                if self.current_frame.closure and self.current_frame.closure.env:
-                    print(f"Current closure env: {self.current_frame.closure.env}")
-            
-            self.current_frame.ip += 1
-            
-            try:
-                # Execute the instruction
-                if opcode == LOAD_CONST:
-                    self.current_frame.stack.append(constants[instruction[1]])
-                
-                elif opcode == LOAD_TRUE:
-                    self.current_frame.stack.append(True)
-                
-                elif opcode == LOAD_FALSE:
-                    self.current_frame.stack.append(False)
-                
+        ops, args = self._decode(instructions)
+        code_size = len(ops)
+
+        frame = base_frame = self.current_frame
+        # Saved caller states: (frame, ops, args, constants, var_cache)
+        calls: List[tuple] = []
+        names = frame.locals
+        slots = frame.slots
+        loops = frame.loops
+        # Outer scope lookups: ip -> (container, key, scope_version)
+        var_cache: Dict[int, tuple] = {}
+        stack = frame.stack
+        push = stack.append
+        pop = stack.pop
+        ip: int = frame.ip
+        debug = self.debug
+        binary_ops = BINARY_OPS
+
+        try:
+            while True:
+                if ip < code_size:
+                    opcode = ops[ip]
+                    arg = args[ip]
+                elif calls:
+                    # Running off the end of a function returns like RETURN
+                    opcode = RETURN
+                    arg = None
+                else:
+                    break
+
+                if debug:
+                    stack_repr = ", ".join(str(x) for x in stack)
+                    print(f"IP: {ip}, Opcode: {OPCODE_NAMES.get(opcode, opcode)}, Stack: [{stack_repr}]")
+                    if len(frame.locals) > 0:
+                        print(f"Current locals: {frame.locals}")
+                    if slots:
+                        bound = {name: value for name, value in zip(frame.closure.local_names, slots)
+                                 if value is not UNBOUND}
+                        print(f"Current slots: {bound}")
+                    if frame.closure and frame.closure.env:
+                        print(f"Current closure env: {frame.closure.env}")
+
+                ip += 1
+
+                # Execute the instruction (most frequent opcodes first)
+                if opcode == LOAD_FAST:
+                    value = slots[arg]
+                    if value is UNBOUND:
+                        # Read before assignment: fall back to the enclosing scopes
+                        value = frame.lookup_var(frame.closure.local_names[arg])
+                    push(value)
+
+                elif opcode == STORE_FAST:
+                    # Store the local in its slot, leaving the value on the stack
+                    slots[arg] = stack[-1]
+
+                elif opcode == REASSIGN_FAST:
+                    if slots[arg] is UNBOUND:
+                        # Not declared yet: reassign in the enclosing scopes
+                        frame.assign_var(frame.closure.local_names[arg], stack[-1])
+                    else:
+                        slots[arg] = stack[-1]
+
                 elif opcode == LOAD_VAR:
-                    name = instruction[1]
-                    try:
-                        value = self.current_frame.lookup_var(name)
-                        self.current_frame.stack.append(value)
-                    except UndefinedVariableError as e:
-                        raise e
-                
+                    if arg in names:
+                        push(names[arg])
+                    else:
+                        # Only this frame's locals can gain the name while it runs,
+                        # so an outer scope found once stays valid for this frame
+                        cached = var_cache.get(ip)
+                        if cached is None or cached[2] != self.scope_version:
+                            container, key = frame.resolve_var(arg)
+                            cached = var_cache[ip] = (container, key, self.scope_version)
+                        push(cached[0][cached[1]])
+
+                elif opcode == LOAD_CONST:
+                    push(constants[arg])
+
                 elif opcode == STORE_VAR:
-                    name = instruction[1]
-                    value = self.current_frame.stack.pop()
-                    # Store the variable in the current scope
-                    self.current_frame.locals[name] = value
-                    # Push the value back onto the stack so it's available for later use
-                    self.current_frame.stack.append(value)
-                
+                    # Store the variable in the current scope, leaving the value on the stack
+                    frame.locals[arg] = stack[-1]
+
                 elif opcode == REASSIGN_VAR:
-                    name = instruction[1]
-                    value = self.current_frame.stack.pop()
-                    try:
-                        self.current_frame.assign_var(name, value)
-                    except UndefinedVariableError as e:
-                        raise e
-                    # Push the value back on the stack for further use
-                    self.current_frame.stack.append(value)
-                
-                elif opcode == ADD:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    try:
-                        result = left + right
-                        self.current_frame.stack.append(result)
-                    except (TypeError, ValueError) as e:
-                        raise InvalidOperationError(f"Cannot add {left} and {right}: {e}")
-                
-                elif opcode == SUBTRACT:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    try:
-                        self.current_frame.stack.append(left - right)
-                    except (TypeError, ValueError) as e:
-                        raise InvalidOperationError(f"Cannot subtract {right} from {left}: {e}")
-                
-                elif opcode == MULTIPLY:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    try:
-                        self.current_frame.stack.append(left * right)
-                    except (TypeError, ValueError) as e:
-                        raise InvalidOperationError(f"Cannot multiply {left} and {right}: {e}")
-                
-                elif opcode == DIVIDE:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    if right == 0:
-                        raise DivisionByZeroError("Division by zero")
-                    try:
-                        self.current_frame.stack.append(left / right)
-                    except (TypeError, ValueError) as e:
-                        raise InvalidOperationError(f"Cannot divide {left} by {right}: {e}")
-                
-                elif opcode == EXPONENT:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    try:
-                        self.current_frame.stack.append(left ** right)
-                    except (TypeError, ValueError) as e:
-                        raise InvalidOperationError(f"Cannot raise {left} to the power of {right}: {e}")
-                
-                elif opcode == MODULO:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    if right == 0:
-                        raise DivisionByZeroError("Modulo by zero")
+                    # Reassign in the enclosing scope, leaving the value on the stack
+                    frame.assign_var(arg, stack[-1])
+
+                elif opcode == JUMP_IF_FALSE:
+                    if not pop():
+                        ip = arg
+
+                elif opcode == JUMP:
+                    ip = arg
+
+                elif opcode == JUMP_IF_TRUE:
+                    if pop():
+                        ip = arg
+
+                elif opcode == FOR_ITER:
+                    value = next(loops[-1], UNBOUND)
+                    if value is UNBOUND:
+                        # Leave the variable one step past the last value, like a counter would
+                        value = loops[-2]()
+                        ip = arg[0]
+                    if arg[2] is None:
+                        names[arg[1]] = value
+                    else:
+                        slots[arg[2]] = value
+
+                elif opcode in binary_ops:
+                    # One handler per operator keeps each path monomorphic for tracing JITs
+                    right = pop()
+                    push(binary_ops[opcode](pop(), right))
+
+                elif opcode == BINARY_CONST:
+                    # Operator with a numeric constant as its right operand
+                    push(CONST_BINARY_OPS[arg[0]](pop(), constants[arg[1]]))
+
+                elif opcode == JUMP_IF_FALSE_OR_POP:
+                    if stack[-1]:
+                        pop()
+                    else:
+                        ip = arg
+
+                elif opcode == MATCH_DICT:
+                    table_idx, default = arg
+                    value = pop()
                     try:
-                        self.current_frame.stack.append(left % right)
-                    except (TypeError, ValueError) as e:
-                        raise InvalidOperationError(f"Cannot compute {left} modulo {right}: {e}")
-                
+                        ip = constants[table_idx].get(value, default)
+                    except TypeError:
+                        ip = default  # Unhashable values equal no literal pattern
+
+                elif opcode == JUMP_IF_TRUE_OR_POP:
+                    if stack[-1]:
+                        ip = arg
+                    else:
+                        pop()
+
+                elif opcode == AND:
+                    right = pop()
+                    push(pop() and right)
+
+                elif opcode == OR:
+                    right = pop()
+                    push(pop() or right)
+
+                elif opcode == NOT:
+                    push(not pop())
+
                 elif opcode == NEGATE:
-                    value = self.current_frame.stack.pop()
+                    value = pop()
                     try:
-                        self.current_frame.stack.append(-value)
+                        push(-value)
                     except (TypeError, ValueError) as e:
                         raise InvalidOperationError(f"Cannot negate {value}: {e}")
-                
-                elif opcode == EQUAL:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    self.current_frame.stack.append(left == right)
-                
-                elif opcode == NOT_EQUAL:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    self.current_frame.stack.append(left != right)
-                
-                elif opcode == LESS_THAN:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    try:
-                        self.current_frame.stack.append(left < right)
-                    except (TypeError, ValueError) as e:
-                        raise InvalidOperationError(f"Cannot compare {left} < {right}: {e}")
-                
-                elif opcode == GREATER_THAN:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    try:
-                        self.current_frame.stack.append(left > right)
-                    except (TypeError, ValueError) as e:
-                        raise InvalidOperationError(f"Cannot compare {left} > {right}: {e}")
-                
-                elif opcode == LESS_EQUAL:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    try:
-                        self.current_frame.stack.append(left <= right)
-                    except (TypeError, ValueError) as e:
-                        raise InvalidOperationError(f"Cannot compare {left} <= {right}: {e}")
-                
-                elif opcode == GREATER_EQUAL:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    try:
-                        self.current_frame.stack.append(left >= right)
-                    except (TypeError, ValueError) as e:
-                        raise InvalidOperationError(f"Cannot compare {left} >= {right}: {e}")
-                
-                elif opcode == AND:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    self.current_frame.stack.append(left and right)
-                
-                elif opcode == OR:
-                    right = self.current_frame.stack.pop()
-                    left = self.current_frame.stack.pop()
-                    self.current_frame.stack.append(left or right)
-                
-                elif opcode == NOT:
-                    value = self.current_frame.stack.pop()
-                    self.current_frame.stack.append(not value)
-                
-                elif opcode == JUMP:
-                    self.current_frame.ip = instruction[1]
-                
-                elif opcode == JUMP_IF_FALSE:
-                    condition = self.current_frame.stack.pop()
-                    if not condition:
-                        self.current_frame.ip = instruction[1]
-                
-                elif opcode == JUMP_IF_TRUE:
-                    condition = self.current_frame.stack.pop()
-                    if condition:
-                        self.current_frame.ip = instruction[1]
-                
+
+                elif opcode == DUP:
+                    push(stack[-1])
+
+                elif opcode == POP:
+                    pop()
+
+                elif opcode == LOAD_TRUE:
+                    push(True)
+
+                elif opcode == LOAD_FALSE:
+                    push(False)
+
+                elif opcode == ARRAY_ACCESS:
+                    index = pop()
+                    array_or_dict = pop()
+
+                    if debug:
+                        print(f"ARRAY_ACCESS: array/dict={array_or_dict}, index={index}")
+
+                    # Values are never subclassed, so exact type checks are enough
+                    kind = type(array_or_dict)
+                    if kind is list or kind is tuple:
+                        if type(index) is int:
+                            if 0 <= index < len(array_or_dict):
+                                push(array_or_dict[index])
+                            else:
+                                raise InvalidOperationError(f"Index {index} out of bounds for array of length {len(array_or_dict)}")
+                        else:
+                            raise InvalidOperationError(f"Array index must be an integer, got {type(index)}")
+                    elif kind is dict:
+                        if index in array_or_dict:
+                            push(array_or_dict[index])
+                        else:
+                            raise InvalidOperationError(f"Key {index} not found in dictionary")
+                    else:
+                        raise InvalidOperationError(f"Cannot access index {index} of {type(array_or_dict)}")
+
+                elif opcode == ARRAY_ASSIGN:
+                    value = pop()
+                    index = pop()
+                    array_or_dict = pop()
+
+                    if debug:
+                        print(f"ARRAY_ASSIGN: array/dict={array_or_dict}, index={index}, value={value}")
+
+                    kind = type(array_or_dict)
+                    if kind is list:
+                        if type(index) is int:
+                            if 0 <= index < len(array_or_dict):
+                                array_or_dict[index] = value
+                                push(value)
+                            else:
+                                raise InvalidOperationError(f"Index {index} out of bounds for array of length {len(array_or_dict)}")
+                        else:
+                            raise InvalidOperationError(f"Array index must be an integer, got {type(index)}")
+                    elif kind is dict:
+                        array_or_dict[index] = value
+                        push(value)
+                    else:
+                        raise InvalidOperationError(f"Cannot assign to index {index} of {type(array_or_dict)}")
+
+                elif opcode == CALL_FUNC or opcode == TAIL_CALL or opcode == DICT_FUNC_CALL:
+                    num_args = arg
+
+                    # Pop arguments from the stack, keeping them in call order
+                    if num_args:
+                        call_args = stack[-num_args:]
+                        del stack[-num_args:]
+                    else:
+                        call_args = []
+
+                    if opcode == DICT_FUNC_CALL:
+                        # Get the key and dictionary from the stack
+                        key = pop()
+                        dictionary = pop()
+
+                        if debug:
+                            print(f"DICT_FUNC_CALL: dict={dictionary}, key={key}, args={call_args}")
+
+                        if type(dictionary) is not dict:
+                            raise InvalidOperationError(f"Cannot access key {key} of non-dictionary {dictionary}")
+
+                        if key not in dictionary:
+                            raise UndefinedVariableError(f"Dictionary key not found: {key}")
+
+                        func = dictionary[key]
+
+                        if type(func) is not Closure:
+                            raise InvalidOperationError(f"Cannot call {key} as a function")
+                    else:
+                        # Normal function call
+                        func = pop()
+
+                        if debug:
+                            print(f"CALL_FUNC: {func}, args: {call_args}")
+
+                        if type(func) is not Closure:
+                            raise InvalidOperationError(f"Cannot call {func} as a function")
+
+                        if (opcode == TAIL_CALL and func is frame.closure
+                                and (call_args or not func.params) and frame.holds_only_arguments()):
+                            # Self tail call: rebind the arguments and restart this frame.
+                            # Lookups search calling frames, so the frame is only reused when
+                            # the new activation's arguments shadow everything it holds.
+                            names.clear()
+                            if slots is not None:
+                                slots[:] = [UNBOUND] * len(slots)
+                            if call_args:
+                                frame.bind_args(call_args)
+                            if func.name != 'lambda' and func.name not in names:
+                                names[func.name] = func
+                            del stack[:]
+                            del loops[:]
+                            var_cache.clear()
+                            ip = 0
+                            continue
+
+                    # Create a new frame for the function execution
+                    new_frame = Frame(
+                        ip=0,
+                        closure=func,
+                        args=call_args,  # Arguments are already in the correct order
+                        parent=frame  # Link to the parent frame
+                    )
+
+                    # If the function needs to reference itself (for recursion)
+                    # add it to its own environment
+                    if func.name != 'lambda' and func.name not in new_frame.locals:
+                        new_frame.locals[func.name] = func
+
+                    # Save the caller
+                    if len(calls) >= MAX_CALL_DEPTH:
+                        raise CallDepthError(f"Maximum call depth of {MAX_CALL_DEPTH} exceeded calling {func.name}")
+                    frame.ip = ip
+                    calls.append((frame, ops, args, constants, var_cache))
+
+                    # Switch to the new frame and the function's code
+                    frame = self.current_frame = new_frame
+                    ops, args = self._decode(func.code)
+                    code_size = len(ops)
+                    constants = func.consts
+                    names = frame.locals
+                    slots = frame.slots
+                    loops = frame.loops
+                    var_cache = {}
+                    stack = frame.stack
+                    push = stack.append
+                    pop = stack.pop
+                    ip = 0
+
+                # Ensure RETURN always pushes a value:
+                elif opcode == RETURN:
+                    value = pop() if stack else None
+                    frame.ip = ip
+                    if not calls:
+                        return value
+
+                    # Resume the caller with the returned value
+                    frame, ops, args, constants, var_cache = calls.pop()
+                    self.current_frame = frame
+                    code_size = len(ops)
+                    names = frame.locals
+                    slots = frame.slots
+                    loops = frame.loops
+                    stack = frame.stack
+                    push = stack.append
+                    pop = stack.pop
+                    ip = frame.ip
+                    push(value)
+
                 elif opcode == DEFINE_FUNC:
-                    name = instruction[1]
-                    func_data = constants[instruction[2]]
-                    
-                    # Create a snapshot of the current environment for the closure
-                    captured_env = {}
-                    
-                    # First capture parameters and local variables from the current scope
-                    for var_name, var_value in self.current_frame.locals.items():
-                        captured_env[var_name] = var_value
-                    
-                    # Also include variables from parent environments
-                    if self.current_frame.closure and self.current_frame.closure.env:
-                        captured_env.update(self.current_frame.closure.env)
-                    
-                    # Also include current locals
-                    for var_name, var_value in self.current_frame.locals.items():
-                        if var_name not in captured_env:  # Don't overwrite existing values
-                            captured_env[var_name] = var_value
-                    
-                    if self.debug:
+                    name, const_idx = arg
+                    func_data = constants[const_idx]
+
+                    # Create a snapshot of the current environment for the closure:
+                    # parameters and locals, overridden by variables from parent environments
+                    captured_env = dict(names)
+                    if frame.closure and frame.closure.env:
+                        captured_env.update(frame.closure.env)
+
+                    if debug:
                         print(f"DEFINE_FUNC: {name} capturing env: {captured_env}")
-                    
+
                     # Create the closure with the captured environment
                     closure = Closure(
                         name=func_data['name'],
                         params=func_data['params'],
                         code=func_data['code'],
                         consts=func_data['consts'],
-                        env=captured_env  # Use the original environment, not a copy
+                        env=captured_env,  # Use the original environment, not a copy
+                        local_names=func_data.get('locals')
                     )
-                    
+
                     # Store the function in the current scope
-                    self.current_frame.locals[name] = closure
-                
-                elif opcode == DICT_FUNC_CALL:
-                    num_args = instruction[1]
-                    args = []
-                    
-                    # Pop arguments from the stack in reverse order
-                    for _ in range(num_args):
-                        args.insert(0, self.current_frame.stack.pop())
-                    
-                    # Get the key and dictionary from the stack
-                    key = self.current_frame.stack.pop()
-                    dictionary = self.current_frame.stack.pop()
-                    
-                    if self.debug:
-                        print(f"DICT_FUNC_CALL: dict={dictionary}, key={key}, args={args}")
-                    
-                    if not isinstance(dictionary, dict):
-                        raise InvalidOperationError(f"Cannot access key {key} of non-dictionary {dictionary}")
-                    
-                    if key not in dictionary:
-                        raise UndefinedVariableError(f"Dictionary key not found: {key}")
-                    
-                    func = dictionary[key]
-                    
-                    if not isinstance(func, Closure):
-                        raise InvalidOperationError(f"Cannot call {key} as a function")
-                    
-                    # Create a new frame for the function execution
-                    new_frame = Frame(
-                        ip=0,
-                        closure=func,
-                        args=args,  # Arguments are already in the correct order
-                        parent=self.current_frame  # Link to the parent frame
-                    )
-                    
-                    # Add the environment from the function's closure
-                    if func.env:
-                        for var_name, var_value in func.env.items():
-                            if var_name not in new_frame.locals:
-                                new_frame.locals[var_name] = var_value
-                    
-                    # If the function needs to reference itself (for recursion)
-                    # add it to its own environment
-                    if func.name != 'lambda' and func.name not in new_frame.locals:
-                        new_frame.locals[func.name] = func
-                    
-                    # Save the current frame as parent
-                    old_frame = self.current_frame
-                    
-                    # Switch to the new frame
-                    self.current_frame = new_frame
-                    
-                    try:
-                        # Execute the function's code
-                        result = self.execute(func.code, func.consts)
-                        
-                        # Propagate changes from closure variables back to the original environment
-                        if func.env:
-                            for var_name, var_value in new_frame.locals.items():
-                                # Update the closure environment with any variable changes
-                                if var_name in func.env:
-                                    func.env[var_name] = var_value
-                        
-                        # Restore the parent frame and push the result
-                        self.current_frame = old_frame
-                        self.current_frame.stack.append(result)
-                    except ReturnException as e:
-                        # Handle return statement
-                        
-                        # Propagate changes from closure variables back to the original environment
-                        if func.env:
-                            for var_name, var_value in new_frame.locals.items():
-                                # Update the closure environment with any variable changes
-                                if var_name in func.env:
-                                    func.env[var_name] = var_value
-                        
-                        # Restore the parent frame
-                        self.current_frame = old_frame
-                        self.current_frame.stack.append(e.value)
-                
+                    frame.locals[name] = closure
+
                 elif opcode == LOAD_LAMBDA:
-                    func_data = constants[instruction[1]]
-                    
-                    # Create a snapshot of the current environment for the closure
-                    captured_env = {}
-                    
-                    # First capture local variables from the current scope
-                    for var_name, var_value in self.current_frame.locals.items():
-                        captured_env[var_name] = var_value
-                    
-                    # Also include variables from parent environments
-                    if self.current_frame.closure and self.current_frame.closure.env:
-                        for var_name, var_value in self.current_frame.closure.env.items():
-                            if var_name not in captured_env:
-                                captured_env[var_name] = var_value
-                    
-                    if self.debug:
+                    func_data = constants[arg]
+
+                    # Create a snapshot of the current environment for the closure:
+                    # variables from parent environments, overridden by the current locals
+                    if frame.closure and frame.closure.env:
+                        captured_env = dict(frame.closure.env)
+                        captured_env.update(names)
+                    else:
+                        captured_env = dict(names)
+
+                    if debug:
                         print(f"LOAD_LAMBDA capturing env: {captured_env}")
-                    
+
                     # Create the closure with the captured environment
                     closure = Closure(
                         name=func_data['name'],
                         params=func_data['params'],
                         code=func_data['code'],
                         consts=func_data['consts'],
-                        env=captured_env.copy()  # Create a deep copy to prevent reference issues
+                        env=captured_env,  # The snapshot is already a fresh dictionary
+                        local_names=func_data.get('locals')
                     )
-                    
+
                     # Push the closure onto the stack
-                    self.current_frame.stack.append(closure)
-                
-                elif opcode == CALL_FUNC:
-                    num_args = instruction[1]
-                    args = []
-                    
-                    # Pop arguments from the stack in the correct order
-                    for _ in range(num_args):
-                        args.insert(0, self.current_frame.stack.pop())
-                    
-                    # Normal function call
-                    func = self.current_frame.stack.pop()
-                    
-                    if self.debug:
-                        print(f"CALL_FUNC: {func}, args: {args}")
-                    
-                    if not isinstance(func, Closure):
-                        raise InvalidOperationError(f"Cannot call {func} as a function")
-                    
-                    # Create a new frame for the function execution
-                    new_frame = Frame(
-                        ip=0,
-                        closure=func,
-                        args=args,  # Arguments are already in the correct order
-                        parent=self.current_frame  # Link to the parent frame
-                    )
-                    
-                    # Add the environment from the function's closure
-                    if func.env:
-                        for var_name, var_value in func.env.items():
-                            if var_name not in new_frame.locals:
-                                new_frame.locals[var_name] = var_value
-                    
-                    # If the function needs to reference itself (for recursion)
-                    # add it to its own environment
-                    if func.name != 'lambda' and func.name not in new_frame.locals:
-                        new_frame.locals[func.name] = func
-                    
-                    # Save the current frame as parent
-                    
-                    old_frame = self.current_frame
-                    
-                    # Switch to the new frame
-                    self.current_frame = new_frame
-                    
-                    try:
-                        # Execute the function's code
-                        result = self.execute(func.code, func.consts)
-                        
-                        # Propagate changes from closure variables back to the original environment
-                        if func.env:
-                            for var_name, var_value in new_frame.locals.items():
-                                # Update the closure environment with any variable changes
-                                if var_name in func.env:
-                                    func.env[var_name] = var_value
-                        
-                        # Restore the parent frame and push the result
-                        self.current_frame = old_frame
-                        self.current_frame.stack.append(result)
-                    except ReturnException as e:
-                        # Handle return statement
-                        
-                        # Propagate changes from closure variables back to the original environment
-                        if func.env:
-                            for var_name, var_value in new_frame.locals.items():
-                                # Update the closure environment with any variable changes
-                                if var_name in func.env:
-                                    func.env[var_name] = var_value
-                        
-                        # Restore the parent frame
-                        self.current_frame = old_frame
-                        self.current_frame.stack.append(e.value)
-                
-                # Ensure RETURN always pushes a value:
-                elif opcode == RETURN:
-                    if not self.current_frame.stack:
-                        value = None
-                    else:
-                        value = self.current_frame.stack.pop()
-                    if self.current_frame.parent is not None:
-                        raise ReturnException(value)
-                    return value
-                
+                    push(closure)
+
+                elif opcode == SETUP_FOR:
+                    step = pop()
+                    end = pop()
+                    iterator, after = for_range(pop(), end, step)
+                    loops.append(after)
+                    loops.append(iterator)
+
+                elif opcode == POP_FOR:
+                    del loops[-2:]
+
                 elif opcode == BUILD_ARRAY:
-                    num_elements = instruction[1]
-                    elements = []
-                    for _ in range(num_elements):
-                        elements.insert(0, self.current_frame.stack.pop())
-                    self.current_frame.stack.append(elements)
-                
+                    if arg:
+                        elements = stack[-arg:]
+                        del stack[-arg:]
+                    else:
+                        elements = []
+                    push(elements)
+
                 elif opcode == BUILD_DICT:
-                    num_pairs = instruction[1]
+                    num_pairs = arg
                     dictionary = {}
                     for _ in range(num_pairs):
-                        value = self.current_frame.stack.pop()
-                        key = self.current_frame.stack.pop()
+                        value = pop()
+                        key = pop()
 
                         # If the value is a Closure, capture the current environment
-                        if isinstance(value, Closure):
-                            captured_env = {}
-                            # Capture current locals
-                            for var_name, var_value in self.current_frame.locals.items():
-                                captured_env[var_name] = var_value
-                            # Capture parent closure env
-                            if self.current_frame.closure and self.current_frame.closure.env:
-                                for var_name, var_value in self.current_frame.closure.env.items():
-                                    if var_name not in captured_env:
-                                        captured_env[var_name] = var_value
-                            # Assign a new env to the closure (deep copy)
-                            value.env = captured_env.copy()
+                        if type(value) is Closure:
+                            # Capture the parent closure env, overridden by the current locals
+                            if frame.closure and frame.closure.env:
+                                captured_env = dict(frame.closure.env)
+                                captured_env.update(names)
+                            else:
+                                captured_env = dict(names)
+                            # Assign the fresh snapshot to the closure
+                            value.env = captured_env
+                            self.scope_version += 1
                         # Ensure the key is hashable
                         try:
                             dictionary[key] = value
                         except (TypeError, ValueError) as e:
                             raise InvalidOperationError(f"Invalid dictionary key {key}: {e}")
-                    self.current_frame.stack.append(dictionary)
-                
-                elif opcode == ARRAY_ACCESS:
-                    index = self.current_frame.stack.pop()
-                    array_or_dict = self.current_frame.stack.pop()
-                    
-                    if self.debug:
-                        print(f"ARRAY_ACCESS: array/dict={array_or_dict}, index={index}")
-                    
-                    if isinstance(array_or_dict, (list, tuple)):
-                        if isinstance(index, int):
-                            if 0 <= index < len(array_or_dict):
-                                self.current_frame.stack.append(array_or_dict[index])
-                            else:
-                                raise InvalidOperationError(f"Index {index} out of bounds for array of length {len(array_or_dict)}")
-                        else:
-                            raise InvalidOperationError(f"Array index must be an integer, got {type(index)}")
-                    elif isinstance(array_or_dict, dict):
-                        if index in array_or_dict:
-                            self.current_frame.stack.append(array_or_dict[index])
-                        else:
-                            raise InvalidOperationError(f"Key {index} not found in dictionary")
-                    else:
-                        raise InvalidOperationError(f"Cannot access index {index} of {type(array_or_dict)}")
-                
-                elif opcode == ARRAY_ASSIGN:
-                    value = self.current_frame.stack.pop()
-                    index = self.current_frame.stack.pop()
-                    array_or_dict = self.current_frame.stack.pop()
-                    
-                    if self.debug:
-                        print(f"ARRAY_ASSIGN: array/dict={array_or_dict}, index={index}, value={value}")
-                    
-                    if isinstance(array_or_dict, list):
-                        if isinstance(index, int):
-                            if 0 <= index < len(array_or_dict):
-                                array_or_dict[index] = value
-                                self.current_frame.stack.append(value)
-                            else:
-                                raise InvalidOperationError(f"Index {index} out of bounds for array of length {len(array_or_dict)}")
-                        else:
-                            raise InvalidOperationError(f"Array index must be an integer, got {type(index)}")
-                    elif isinstance(array_or_dict, dict):
-                        array_or_dict[index] = value
-                        self.current_frame.stack.append(value)
-                    else:
-                        raise InvalidOperationError(f"Cannot assign to index {index} of {type(array_or_dict)}")
-                
+                    push(dictionary)
+
                 elif opcode == GET_SIZE:
                     # Get the size/length of a collection (string, array, or dictionary)
-                    collection = self.current_frame.stack.pop()
-                    
-                    if self.debug:
+                    collection = pop()
+
+                    if debug:
                         print(f"GET_SIZE: collection={collection}")
-                    
+
+                    kind = type(collection)
                     if collection is None:
                         # None has a size of 0
-                        self.current_frame.stack.append(0)
-                    elif isinstance(collection, (list, tuple)):
+                        push(0)
+                    elif kind is list or kind is tuple:
                         # For arrays/lists
-                        self.current_frame.stack.append(len(collection))
-                    elif isinstance(collection, dict):
+                        push(len(collection))
+                    elif kind is dict:
                         # For dictionaries
-                        self.current_frame.stack.append(len(collection))
-                    elif isinstance(collection, str):
+                        push(len(collection))
+                    elif kind is str:
                         # For strings
-                        self.current_frame.stack.append(len(collection))
+                        push(len(collection))
                     else:
                         # For unsupported types
                         raise InvalidOperationError(f"Cannot get size of {type(collection)}")
-                
+
                 elif opcode == MULTI_DIM_ACCESS:
                     # For accessing multi-dimensional arrays (e.g., arr[i][j])
                     # The number of dimensions is stored in the instruction
-                    num_dims = instruction[1]
-                    
+                    num_dims = arg
+
                     # Pop all indices from the stack
-                    indices = []
-                    for _ in range(num_dims):
-                        indices.insert(0, self.current_frame.stack.pop())
-                    
+                    if num_dims:
+                        indices = stack[-num_dims:]
+                        del stack[-num_dims:]
+                    else:
+                        indices = []
+
                     # Get the base array
-                    array = self.current_frame.stack.pop()
-                    
-                    if self.debug:
+                    array = pop()
+
+                    if debug:
                         print(f"MULTI_DIM_ACCESS: array={array}, indices={indices}")
-                    
+
                     # Navigate through the dimensions
                     current = array
                     for i, index in enumerate(indices):
-                        if isinstance(current, (list, tuple)):
-                            if isinstance(index, int):
+                        kind = type(current)
+                        if kind is list or kind is tuple:
+                            if type(index) is int:
                                 if 0 <= index < len(current):
                                     current = current[index]
                                 else:
                                     raise InvalidOperationError(f"Index {index} out of bounds for array of length {len(current)} at dimension {i+1}")
                             else:
                                 raise InvalidOperationError(f"Array index must be an integer, got {type(index)} at dimension {i+1}")
-                        elif isinstance(current, dict):
+                        elif kind is dict:
                             if index in current:
                                 current = current[index]
                             else:
                                 raise InvalidOperationError(f"Key {index} not found in dictionary at dimension {i+1}")
                         else:
                             raise InvalidOperationError(f"Cannot access index {index} of {type(current)} at dimension {i+1}")
-                    
+
                     # Push the final result onto the stack
-                    self.current_frame.stack.append(current)
-                
+                    push(current)
+
                 elif opcode == MULTI_DIM_ASSIGN:
                     # For assigning to multi-dimensional arrays (e.g., arr[i][j] = value)
                     # The number of dimensions is stored in the instruction
-                    num_dims = instruction[1]
-                    
+                    num_dims = arg
+
                     # Get the value to assign
-                    value = self.current_frame.stack.pop()
-                    
+                    value = pop()
+
                     # Pop all indices from the stack
-                    indices = []
-                    for _ in range(num_dims):
-                        indices.insert(0, self.current_frame.stack.pop())
-                    
+                    if num_dims:
+                        indices = stack[-num_dims:]
+                        del stack[-num_dims:]
+                    else:
+                        indices = []
+
                     # Get the base array
-                    array = self.current_frame.stack.pop()
-                    
-                    if self.debug:
+                    array = pop()
+
+                    if debug:
                         print(f"MULTI_DIM_ASSIGN: array={array}, indices={indices}, value={value}")
-                    
+
                     # Navigate to the second-to-last dimension
                     current = array
                     for i, index in enumerate(indices[:-1]):
-                        if isinstance(current, (list, tuple)):
-                            if isinstance(index, int):
+                        kind = type(current)
+                        if kind is list or kind is tuple:
+                            if type(index) is int:
                                 if 0 <= index < len(current):
                                     # Convert tuple to list if needed
-                                    if isinstance(current, tuple):
+                                    if kind is tuple:
                                         # This is just for completeness, tuples are immutable
                                         raise InvalidOperationError("Cannot modify a tuple")
                                     current = current[index]
@@ -894,23 +1111,24 @@ class BytecodeVM:
                                     raise InvalidOperationError(f"Index {index} out of bounds for array of length {len(current)} at dimension {i+1}")
                             else:
                                 raise InvalidOperationError(f"Array index must be an integer, got {type(index)} at dimension {i+1}")
-                        elif isinstance(current, dict):
+                        elif kind is dict:
                             if index in current:
                                 current = current[index]
                             else:
                                 # Create a new dictionary or list for this key
                                 if i < len(indices) - 2:
-                                    current[index] = {} if isinstance(indices[i+1], (str, bool, float)) else []
+                                    current[index] = {} if type(indices[i+1]) in (str, bool, float) else []
                                 else:
                                     current[index] = []
                                 current = current[index]
                         else:
                             raise InvalidOperationError(f"Cannot access index {index} of {type(current)} at dimension {i+1}")
-                    
+
                     # Assign to the last dimension
                     last_index = indices[-1]
-                    if isinstance(current, list):
-                        if isinstance(last_index, int):
+                    kind = type(current)
+                    if kind is list:
+                        if type(last_index) is int:
                             if 0 <= last_index < len(current):
                                 current[last_index] = value
                             else:
@@ -923,62 +1141,51 @@ class BytecodeVM:
                                     raise InvalidOperationError(f"Index {last_index} too large for automatic array expansion (limit: 1000)")
                         else:
                             raise InvalidOperationError(f"Array index must be an integer, got {type(last_index)}")
-                    elif isinstance(current, dict):
+                    elif kind is dict:
                         current[last_index] = value
                     else:
                         raise InvalidOperationError(f"Cannot assign to index {last_index} of {type(current)}")
-                    
+
                     # Push the assigned value onto the stack
-                    self.current_frame.stack.append(value)
-                
+                    push(value)
+
                 elif opcode == PRINT:
-                    value = self.current_frame.stack.pop()
-                    print(value)
-                
-                elif opcode == POP:
-                    self.current_frame.stack.pop()
-                
-                elif opcode == DUP:
-                    value = self.current_frame.stack[-1]
-                    self.current_frame.stack.append(value)
-                
+                    # A single write per value, without print()'s separator and keyword handling
+                    sys.stdout.write(stringify(pop()) + "\n")
+
                 elif opcode == HALT:
+                    # HALT stops the whole program, even inside a function
                     self.running = False
+                    frame.ip = ip
+                    self.current_frame = base_frame
                     # Return the top value on the stack (if any)
-                    if self.current_frame.stack:
-                        return self.current_frame.stack[-1]
+                    if stack:
+                        return stack[-1]
                     # If in the global frame and no stack value, return all global variables
-                    if self.current_frame == self.global_frame:
+                    if frame is self.global_frame:
                         return self.global_frame.locals
-                    return last_value
-                
+                    return None
+
                 else:
                     raise InvalidOperationError(f"Unknown opcode: {opcode}")
-                
-                # Update last_value after each instruction that modifies the stack
-                if self.current_frame.stack:
-                    last_value = self.current_frame.stack[-1]
-                
-            except UndefinedVariableError as e:
-                print(f"Runtime Error: {e}")
-                self.running = False
-                return None
-            except Exception as e:
-                if isinstance(e, ReturnException):
-                    raise e
-                print(f"Runtime Error: {e}")
-                self.running = False
-                return None
-        
+
+        except Exception as e:
+            print(f"Runtime Error: {e}")
+            self.running = False
+            self.current_frame = base_frame
+            return None
+
+        frame.ip = ip
+
         # Return the top value on the stack (if any)
-        if self.current_frame.stack:
-            return self.current_frame.stack[-1]
+        if stack:
+            return stack[-1]
         # If in the global frame and no stack value, return all global variables
-        if self.current_frame == self.global_frame:
+        if frame is self.global_frame:
             return self.global_frame.locals.copy()
         return None
-    
-    def run_program(self, instructions, constants):
+
+    def run_program(self, instructions: List[tuple], constants: list) -> Any:
         """
         Run a complete program from the beginning.
         Args:
@@ -1005,12 +1212,12 @@ def run_example():
     Example usage of the BytecodeVM with a simple AST and bytecode.
     """
     from .compiler import BytecodeCompiler
-    from AST.ast_1 import Integer, BinOp, Token
+    from src.AST.ast_1 import Integer, BinOp, Token
     
     # Create a simple AST: 2 + 3
     ast = BinOp(
         Integer(2),
-        Token('PLUS', '+', 0, 0),
+        Token('PLUS', '+', 0),
         Integer(3)
     )
     
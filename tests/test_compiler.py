@@ -8,6 +8,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.lexer.lexer import Lexer
 from src.parser.parser import Parser
 from src.bytecode.compiler import BytecodeCompiler
+from src.AST.ast_1 import *
+from src.lexer.lexer import Token
 from src.bytecode.opcodes import *
 
 class TestCompiler(unittest.TestCase):
@@ -113,13 +115,15 @@ class TestCompiler(unittest.TestCase):
     
     def test_compile_logical_operations(self):
         """Test compilation of logical operations"""
-        # AND
+        # AND short-circuits past the right operand when the left one is false
         instructions, constants = self.compile_code("True and False")
-        self.assertIn(AND, [instr[0] for instr in instructions])
+        self.assertEqual(instructions[1], (JUMP_IF_FALSE_OR_POP, 3))
+        self.assertEqual(instructions[2][0], LOAD_FALSE)
         
-        # OR
+        # OR short-circuits past the right operand when the left one is true
         instructions, constants = self.compile_code("True or False")
-        self.assertIn(OR, [instr[0] for instr in instructions])
+        self.assertEqual(instructions[1], (JUMP_IF_TRUE_OR_POP, 3))
+        self.assertEqual(instructions[2][0], LOAD_FALSE)
         
         # NOT
         instructions, constants = self.compile_code("not True")
@@ -164,25 +168,79 @@ class TestCompiler(unittest.TestCase):
         # Should include JUMP for else branch
         self.assertIn(JUMP, [instr[0] for instr in instructions])
     
+    def test_compile_negated_conditions(self):
+        """Test that a negated condition inverts the jump instead of emitting NOT"""
+        instructions, constants = self.compile_code("let done = False\nif (not done) { 5 }")
+        opcodes = [instr[0] for instr in instructions]
+        self.assertNotIn(NOT, opcodes)
+        self.assertIn(JUMP_IF_TRUE, opcodes)
+        
+        # The loop test jumps back to the body while the condition holds
+        instructions, constants = self.compile_code("let done = False\nwhile (not done) { 5 }")
+        opcodes = [instr[0] for instr in instructions]
+        self.assertNotIn(NOT, opcodes)
+        self.assertIn(JUMP_IF_FALSE, opcodes)
+        
+        instructions, constants = self.compile_code("let done = False\nwhile (not not done) { 5 }")
+        opcodes = [instr[0] for instr in instructions]
+        self.assertNotIn(NOT, opcodes)
+        self.assertIn(JUMP_IF_TRUE, opcodes)
+    
     def test_compile_while_loops(self):
         """Test compilation of while loops"""
         instructions, constants = self.compile_code("while (True) { 5 }")
-        # Should include JUMP_IF_FALSE for conditional branch
-        self.assertIn(JUMP_IF_FALSE, [instr[0] for instr in instructions])
-        # Should include JUMP for loop back
-        self.assertIn(JUMP, [instr[0] for instr in instructions])
+        # Should enter the loop with a JUMP to the condition
+        self.assertEqual(instructions[0][0], JUMP)
+        self.assertEqual(instructions[instructions[0][1]][0], LOAD_TRUE)
+        # Should include JUMP_IF_TRUE for the loop back to the body
+        self.assertIn((JUMP_IF_TRUE, 1), instructions)
+    
+    def test_compile_repeat_until_loops(self):
+        """Test compilation of repeat-until loops"""
+        # repeat { x assign x + 1 } until (x > 3)
+        token = Token('IDENTIFIER', 'x', 1)
+        body = Block([VarReassign('x', BinOp(Var('x', token), Token('PLUS', '+', 1), Integer(1)), token)])
+        condition = BinOp(Var('x', token), Token('GREATER_THAN', '>', 1), Integer(3))
+        instructions, constants = BytecodeCompiler().compile(RepeatUntil(body, condition))
+        # The body comes first and the loop jumps back to it while the condition is false
+        self.assertEqual(instructions[0], (LOAD_VAR, 'x'))
+        self.assertIn((JUMP_IF_FALSE, 0), instructions)
+    
+    def test_compile_match(self):
+        """Test compilation of match statements"""
+        # match x { case 1 -> 10, case "one" -> 20, case 1 -> 30 }
+        token = Token('IDENTIFIER', 'x', 1)
+        cases = [MatchCase(Integer(1), Integer(10)), MatchCase(String("one"), Integer(20)),
+                 MatchCase(Integer(1), Integer(30))]
+        instructions, constants = BytecodeCompiler().compile(Match(Var('x', token), cases))
+        # Literal patterns compile to a single table lookup
+        self.assertEqual(instructions[1][0], MATCH_DICT)
+        table = constants[instructions[1][1]]
+        self.assertEqual(sorted(table, key=str), [1, "one"])
+        # The first case with a pattern wins and unmatched values skip every body
+        self.assertEqual(instructions[table[1]], (LOAD_CONST, constants.index(10)))
+        self.assertEqual(instructions[instructions[1][2]], (HALT,))
+        
+        # Non-literal patterns are compared one case at a time
+        cases = [MatchCase(Var('y', token), Integer(10)), MatchCase(Integer(2), Integer(20))]
+        instructions, constants = BytecodeCompiler().compile(Match(Var('x', token), cases))
+        self.assertNotIn(MATCH_DICT, [instr[0] for instr in instructions])
+        self.assertEqual([instr[0] for instr in instructions].count(EQUAL), 2)
+        self.assertEqual(instructions[1], (DUP,))
     
     def test_compile_for_loops(self):
         """Test compilation of for loops"""
         instructions, constants = self.compile_code("for (let i = 0 to 10) { print i }")
-        # Should declare loop variable
-        self.assertIn(STORE_VAR, [instr[0] for instr in instructions])
-        # Should include comparison operators
-        self.assertIn(GREATER_THAN, [instr[0] for instr in instructions])  # Changed from LESS_EQUAL
-        # Should include JUMP_IF_TRUE for conditional branch
-        self.assertIn(JUMP_IF_TRUE, [instr[0] for instr in instructions])  # Changed from JUMP_IF_FALSE
+        # Should set up the loop counter
+        self.assertIn(SETUP_FOR, [instr[0] for instr in instructions])
+        # Should store each value in the loop variable
+        for_iter = [instr for instr in instructions if instr[0] == FOR_ITER]
+        self.assertEqual(len(for_iter), 1)
+        self.assertEqual(for_iter[0][2], "i")
         # Should include JUMP for loop back
         self.assertIn(JUMP, [instr[0] for instr in instructions])
+        # Should finish the loop where FOR_ITER exits
+        self.assertEqual(instructions[for_iter[0][1]][0], POP_FOR)
     
     def test_compile_function_definition(self):
         """Test compilation of function definition"""
@@ -196,6 +254,35 @@ class TestCompiler(unittest.TestCase):
         for idx in function_define_indices:
             self.assertEqual(instructions[idx][1], "add")  # The function name is the first parameter
     
+    def test_compile_function_locals_to_slots(self):
+        """Test that function parameters and locals are resolved to slots"""
+        instructions, constants = self.compile_code("func add(a, b) { let c = a + b\nreturn c }")
+        func_data = constants[instructions[0][2]]
+        self.assertEqual(func_data['locals'], ['a', 'b', 'c'])
+
+        body_ops = [instr[0] for instr in func_data['code']]
+        self.assertIn(LOAD_FAST, body_ops)
+        self.assertIn(STORE_FAST, body_ops)
+        self.assertNotIn(LOAD_VAR, body_ops)
+        self.assertNotIn(STORE_VAR, body_ops)
+
+    def test_compile_closure_locals_by_name(self):
+        """Test that functions creating closures keep name-based locals"""
+        code = """
+        func makeCounter() {
+            let count = 0
+            func increment() {
+                count assign count + 1
+                return count
+            }
+            return increment
+        }
+        """
+        instructions, constants = self.compile_code(code)
+        func_data = constants[instructions[0][2]]
+        self.assertIsNone(func_data['locals'])
+        self.assertNotIn(STORE_FAST, [instr[0] for instr in func_data['code']])
+
     def test_compile_function_call(self):
         """Test compilation of function calls"""
         instructions, constants = self.compile_code("func add(a, b) { return a + b }\nadd(1, 2)")
@@ -208,6 +295,25 @@ class TestCompiler(unittest.TestCase):
             # Check that we pushed the right number of arguments (2 in this case)
             self.assertEqual(instructions[idx][1], 2)
     
+    def test_compile_tail_call(self):
+        """Test that returning a call result compiles to a tail call"""
+        instructions, constants = self.compile_code("func count(n) { if (n == 0) { return 0 } return count(n - 1) }")
+        func_code = constants[instructions[0][2]]['code']
+        opcodes = [instr[0] for instr in func_code]
+        self.assertIn(TAIL_CALL, opcodes)
+        self.assertNotIn(CALL_FUNC, opcodes)
+        # The call's argument count is kept on the tail call
+        self.assertEqual(func_code[opcodes.index(TAIL_CALL)][1], 1)
+        # RETURN follows, for calls the VM does not run in place
+        self.assertEqual(func_code[opcodes.index(TAIL_CALL) + 1], (RETURN,))
+        
+        # Returning a call to another function is an ordinary call
+        instructions, constants = self.compile_code("func outer(n) { return inner(n) }")
+        func_code = constants[instructions[0][2]]['code']
+        opcodes = [instr[0] for instr in func_code]
+        self.assertNotIn(TAIL_CALL, opcodes)
+        self.assertEqual(func_code[opcodes.index(CALL_FUNC) + 1], (RETURN,))
+    
     def test_compile_array_literals(self):
         """Test compilation of array literals"""
         instructions, constants = self.compile_code("[1, 2, 3]")
@@ -254,5 +360,16 @@ class TestCompiler(unittest.TestCase):
         # Should include print operation
         self.assertIn(PRINT, [instr[0] for instr in instructions])
 
+    def test_compile_binary_const(self):
+        """Test that numeric literal right operands are fused into BINARY_CONST"""
+        instructions, constants = self.compile_code("let x = 1\nx * 2")
+        self.assertEqual(instructions[-2][:2], (BINARY_CONST, MULTIPLY))
+        self.assertEqual(constants[instructions[-2][2]], 2)
+        
+        # Division by a literal zero keeps the generic opcode so the VM reports the error
+        instructions, constants = self.compile_code("let x = 1\nx / 0")
+        self.assertEqual(instructions[-2], (DIVIDE,))
+        self.assertNotIn(BINARY_CONST, [instr[0] for instr in instructions])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
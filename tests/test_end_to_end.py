@@ -7,8 +7,9 @@ from unittest.mock import patch
 # Add the parent directory to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.lexer.lexer import Lexer
+from src.lexer.lexer import Lexer, Token
 from src.parser.parser import Parser
+from src.AST.ast_1 import *
 from src.bytecode.compiler import BytecodeCompiler
 from src.bytecode.vm import BytecodeVM
 
@@ -41,6 +42,11 @@ class TestEndToEnd(unittest.TestCase):
         
         return result
     
+    def run_ast(self, ast):
+        """Helper method to compile and run an AST built by hand"""
+        instructions, constants = BytecodeCompiler().compile(ast)
+        return BytecodeVM().run_program(instructions, constants)
+    
     def test_arithmetic(self):
         """Test arithmetic operations end-to-end"""
         self.assertEqual(self.run_code("5 + 3"), 8)
@@ -66,6 +72,11 @@ class TestEndToEnd(unittest.TestCase):
         # Combinations
         self.assertEqual(self.run_code("5 > 3 and 10 < 20"), True)
         self.assertEqual(self.run_code("5 > 30 or 10 < 20"), True)
+        
+        # Short-circuiting skips the right operand
+        self.assertEqual(self.run_code("let x = 0\nx != 0 and 10 / x > 1"), False)
+        self.assertEqual(self.run_code("let x = 0\nx == 0 or 10 / x > 1"), True)
+        self.assertEqual(self.run_code("let x = 0\nx or \"default\""), "default")
     
     def test_variables(self):
         """Test variable declarations and assignments end-to-end"""
@@ -101,6 +112,10 @@ x + y""")
         }
         """
         self.assertEqual(self.run_code(code), 42)
+        
+        # Negated conditions
+        self.assertEqual(self.run_code("let x = 0\nif (not x) { 42 } else { 100 }"), 42)
+        self.assertEqual(self.run_code("let x = \"a\"\nif (not x) { 42 } else { 100 }"), 100)
     
     def test_loops(self):
         """Test loop statements end-to-end"""
@@ -137,7 +152,164 @@ x + y""")
         """
         # Manually calculating: 0 + 2 + 4 + 6 + 8 + 10 = 30
         self.assertEqual(self.run_code(code), 30)
+        
+        # While loops that never run, continue and break
+        code = """
+        let i = 0
+        let sum = 0
+        while (i > 100) {
+            sum assign 1000
+        }
+        while (True) {
+            i assign i + 1
+            if (i % 2 == 0) {
+                continue
+            }
+            if (i > 7) {
+                break
+            }
+            sum assign sum + i
+        }
+        sum
+        """
+        self.assertEqual(self.run_code(code), 16)  # 1 + 3 + 5 + 7
+        
+        # The condition is tested at the bottom of the loop: continue re-tests it
+        # and break in a nested loop only leaves the inner loop
+        code = """
+        let i = 0
+        let sum = 0
+        while (i < 5) {
+            i assign i + 1
+            if (i == 5) {
+                continue
+            }
+            let j = 0
+            while (True) {
+                j assign j + 1
+                if (j > i) {
+                    break
+                }
+                sum assign sum + 1
+            }
+        }
+        sum
+        """
+        self.assertEqual(self.run_code(code), 10)  # 1 + 2 + 3 + 4
+    
+    def test_repeat_until(self):
+        """Test repeat-until loops end-to-end (the parser has no repeat syntax yet)"""
+        def parse(source):
+            return Parser(Lexer(source)).parse()
+        
+        def run_repeat(body, condition):
+            # let i = 0; let sum = 0; repeat { body } until (condition); sum
+            return self.run_ast(Block(
+                parse("let i = 0\nlet sum = 0").statements
+                + [RepeatUntil(parse(body), parse(condition).statements[0])]
+                + parse("sum").statements
+            ))
+        
+        # The body runs once even when the condition already holds
+        self.assertEqual(run_repeat("sum assign sum + 1", "True"), 1)
+        # The loop repeats until the condition holds
+        self.assertEqual(run_repeat("i assign i + 1\nsum assign sum + i", "i >= 4"), 10)
+        
+        # continue jumps to the condition
+        body = """
+        i assign i + 1
+        if (i % 2 == 0) {
+            continue
+        }
+        sum assign sum + i
+        """
+        self.assertEqual(run_repeat(body, "i >= 6"), 9)  # 1 + 3 + 5
+        
+        # break leaves the loop without testing the condition
+        body = """
+        i assign i + 1
+        if (i == 3) {
+            break
+        }
+        sum assign sum + i
+        """
+        self.assertEqual(run_repeat(body, "False"), 3)  # 1 + 2
     
+    def test_for_loop_counter(self):
+        """Test for loop counter bookkeeping end-to-end"""
+        code = """
+        for (let i = 1 to 100) {
+        }
+        """
+        lexer = Lexer(code)
+        ast = Parser(lexer).parse()
+        instructions, constants = BytecodeCompiler().compile(ast)
+        vm = BytecodeVM()
+        vm.run_program(instructions, constants)
+        self.assertEqual(vm.global_frame.stack, [])
+
+        # Continue moves on to the next value of the counter
+        code = """
+        let sum = 0
+        for (let i = 1 to 5) {
+            if (i == 3) {
+                continue
+            }
+            sum assign sum + i
+        }
+        sum
+        """
+        self.assertEqual(self.run_code(code), 12)
+
+        # Negative and fractional steps
+        code = """
+        let total = 0
+        for (let i = 10 to 1 step -3) {
+            total assign total + i
+        }
+        for (let x = 0 to 1 step 0.5) {
+            total assign total + x
+        }
+        total
+        """
+        self.assertEqual(self.run_code(code), 23.5)  # 10 + 7 + 4 + 1 + 0 + 0.5 + 1.0
+
+        # Breaking out of an inner loop only finishes that loop
+        code = """
+        let count = 0
+        for (let i = 1 to 4) {
+            for (let j = 1 to 10) {
+                if (j > i) {
+                    break
+                }
+                count assign count + 1
+            }
+        }
+        count
+        """
+        self.assertEqual(self.run_code(code), 10)
+
+        # After the loop the variable is one step past the last value
+        code = """
+        for (let i = 0 to 10 step 2) {
+            0
+        }
+        i
+        """
+        self.assertEqual(self.run_code(code), 12)
+
+        # A loop that never runs still binds its variable to the start value
+        code = """
+        func empty() {
+            for (let i = 5 to 1 step 1) {
+                0
+            }
+            return i
+        }
+        empty()
+        """
+        self.assertEqual(self.run_code(code), 5)
+
     def test_functions(self):
         """Test function definitions and calls end-to-end"""
         # Simple function
@@ -174,7 +346,180 @@ x + y""")
         factorial(5)
         """
         self.assertEqual(self.run_code(code), 120)  # 5! = 120
+        
+        # Self tail calls reuse the frame, so they don't run out of recursion depth
+        code = """
+        func sum_down(n, acc) {
+            if (n == 0) {
+                return acc
+            }
+            return sum_down(n - 1, acc + n)
+        }
+        sum_down(5000, 0)
+        """
+        self.assertEqual(self.run_code(code), 12502500)
+        with patch('src.bytecode.vm.MAX_CALL_DEPTH', 50):
+            self.assertEqual(self.run_code(code.replace("5000", "1000")), 500500)
+        
+        # A returned call still sees the caller's locals, as an ordinary call does
+        code = """
+        func reader() { return secret + 1 }
+        func caller() {
+            let secret = 100
+            return reader()
+        }
+        caller()
+        """
+        self.assertEqual(self.run_code(code), 101)
+        
+        # A self tail call whose frame holds more than its arguments keeps the
+        # previous activation's locals visible
+        code = """
+        func f(n) {
+            if (n == 0) {
+                return y
+            }
+            let y = n
+            return f(n - 1)
+        }
+        f(3)
+        """
+        self.assertEqual(self.run_code(code), 1)
+        
+        # Calls don't recurse in Python, so deep non-tail recursion works too
+        code = """
+        func depth(n) {
+            if (n == 0) {
+                return 0
+            }
+            return 1 + depth(n - 1)
+        }
+        depth(3000)
+        """
+        self.assertEqual(self.run_code(code), 3000)
+        
+        # Tail calls to other functions return the callee's result
+        code = """
+        func is_even(n) {
+            if (n == 0) {
+                return True
+            }
+            return is_odd(n - 1)
+        }
+        func is_odd(n) {
+            if (n == 0) {
+                return False
+            }
+            return is_even(n - 1)
+        }
+        is_even(10)
+        """
+        self.assertEqual(self.run_code(code), True)
+        
+        # Early return from inside a loop hands the value back to the caller
+        code = """
+        func first_multiple(n, k) {
+            let i = 1
+            while (True) {
+                if (i % k == 0 and i > n) {
+                    return i
+                }
+                i assign i + 1
+            }
+        }
+        first_multiple(10, 7) + first_multiple(20, 7)
+        """
+        self.assertEqual(self.run_code(code), 35)
     
+    def test_function_locals(self):
+        """Test slot-resolved function locals end-to-end"""
+        # Locals shadow globals of the same name
+        code = """
+        let total = 100
+        func sum_to(n) {
+            let total = 0
+            for (let i = 1 to n) {
+                total assign total + i
+            }
+            return total
+        }
+        sum_to(10) + total
+        """
+        self.assertEqual(self.run_code(code), 155)
+
+        # Reading a local before its declaration falls back to the enclosing scope
+        code = """
+        let x = 5
+        func shadow() {
+            let y = x
+            let x = y + 1
+            return x
+        }
+        shadow()
+        """
+        self.assertEqual(self.run_code(code), 6)
+
+        # Reassigning a local before its declaration runs updates the enclosing variable,
+        # which later calls see
+        code = """
+        let total = 0
+        func bump(flag) {
+            if (flag) {
+                let total = 100
+            }
+            total assign total + 1
+            return total
+        }
+        bump(False)
+        bump(False)
+        bump(False)
+        """
+        self.assertEqual(self.run_code(code), 3)
+
+        # A call site keeps resolving the outer function until a local shadows it
+        code = """
+        func run(n) {
+            let s = 0
+            for (let i = 1 to n) {
+                s assign s + scale(i)
+                if (i == 2) {
+                    func scale(x) { return x * 100 }
+                }
+            }
+            return s
+        }
+        func scale(x) { return x }
+        run(4)
+        """
+        self.assertEqual(self.run_code(code), 703)
+
+        # Missing arguments are bound to None and extra arguments are ignored,
+        # both for slot-resolved parameters and for functions that create closures
+        code = """
+        func first(a, b) { return a }
+        func outer(a, b) {
+            func inner() { return a }
+            return inner()
+        }
+        first(4) + first(5, 6, 7) + outer(10) + outer(20, 30, 40)
+        """
+        self.assertEqual(self.run_code(code), 39)
+
+        # The debug trace lists only the slots that have been assigned
+        code = """
+        func pair(a) {
+            let b = a + 1
+            return b
+        }
+        pair(2)
+        """
+        with patch('sys.stdout', new_callable=io.StringIO) as mock_stdout:
+            self.assertEqual(self.run_code(code, debug=True), 3)
+        output = mock_stdout.getvalue()
+        self.assertIn("Current slots: {'a': 2}", output)
+        self.assertIn("Current slots: {'a': 2, 'b': 3}", output)
+        self.assertNotIn("object at", output)
+
     def test_closures(self):
         """Test closures and nested functions end-to-end"""
         code = """
@@ -198,6 +543,25 @@ x + y""")
         result = self.run_code(code)
         print(f"Result of closures test: {result}")
         self.assertEqual(result, 3)
+        
+        # Captured variables are updated in place across calls of the closure
+        code = """
+        func makeAccumulator(start) {
+            let total = start
+            
+            func add(amount) {
+                total assign total + amount
+                return total
+            }
+            
+            return add
+        }
+        
+        let acc = makeAccumulator(10)
+        acc(5)
+        acc(7) + makeAccumulator(1)(1)
+        """
+        self.assertEqual(self.run_code(code), 24)
     
     def test_arrays(self):
         """Test array operations end-to-end"""
@@ -226,6 +590,43 @@ x + y""")
         """
         self.assertEqual(self.run_code(code), 6)  # 1 + 2 + 3 = 6
     
+    def test_match(self):
+        """Test match statements end-to-end (the parser has no match syntax yet)"""
+        token = Token('IDENTIFIER', 'r', 1)
+        
+        def run_match(subject, patterns):
+            # let r = 0; match subject { case pattern_i -> r assign i + 1 }; r
+            cases = [MatchCase(pattern, VarReassign('r', Integer(i + 1), token))
+                     for i, pattern in enumerate(patterns)]
+            return self.run_ast(Block([
+                VarAssign('y', Integer(7), token),
+                VarAssign('r', Integer(0), token),
+                Match(subject, cases),
+                Var('r', token)
+            ]))
+        
+        literals = [Integer(1), String("two"), Integer(3)]
+        # A hit runs its case through the MATCH_DICT table
+        self.assertEqual(run_match(String("two"), literals), 2)
+        self.assertEqual(run_match(Integer(3), literals), 3)
+        # A miss jumps past every case
+        self.assertEqual(run_match(Integer(4), literals), 0)
+        
+        # 1, 1.0 and True are equal, so each selects the first of those patterns
+        mixed = [Float(1.0), Boolean(True), Integer(1)]
+        self.assertEqual(run_match(Integer(1), mixed), 1)
+        self.assertEqual(run_match(Boolean(True), mixed), 1)
+        self.assertEqual(run_match(Float(1.0), [Boolean(True), Integer(1)]), 1)
+        
+        # An unhashable subject equals no literal pattern
+        self.assertEqual(run_match(Array([Integer(1)]), literals), 0)
+        
+        # Non-literal patterns are compared one case at a time
+        scanned = [Integer(1), Var('y', token), Integer(7)]
+        self.assertEqual(run_match(Integer(7), scanned), 2)
+        self.assertEqual(run_match(Integer(1), scanned), 1)
+        self.assertEqual(run_match(Integer(5), scanned), 0)
+    
     def test_dictionaries(self):
         """Test dictionary operations end-to-end"""
         # Dictionary creation
@@ -266,6 +667,18 @@ x + y""")
         # Check printed output
         self.assertEqual(mock_stdout.getvalue().strip(), "Hello, World!")
     
+    @patch('sys.stdout', new_callable=io.StringIO)
+    def test_print_values(self, mock_stdout):
+        """Test printing non-string values end-to-end"""
+        code = """
+        print 42
+        print 2.5
+        print True
+        print [1, "a"]
+        """
+        self.run_code(code)
+        self.assertEqual(mock_stdout.getvalue().splitlines(), ["42", "2.5", "True", "[1, 'a']"])
+    
     def test_complex_program(self):
         """Test a more complex program that uses multiple language features"""
         code = """
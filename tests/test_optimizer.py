@@ -0,0 +1,111 @@
+import unittest
+import sys
+import os
+import math
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.lexer.lexer import Lexer
+from src.parser.parser import Parser
+from src.AST.ast_1 import *
+from src.bytecode.compiler import BytecodeCompiler
+from src.bytecode.optimizer import ConstantFolder
+from src.bytecode.vm import BytecodeVM
+from src.bytecode.opcodes import *
+
+class TestConstantFolder(unittest.TestCase):
+    def fold_code(self, source_code):
+        """Helper method to parse source code and fold its constant expressions"""
+        lexer = Lexer(source_code)
+        parser = Parser(lexer)
+        ast = parser.parse()
+        return ConstantFolder().fold(ast)
+    
+    def compile_code(self, source_code):
+        """Helper method to fold and compile source code to bytecode"""
+        return BytecodeCompiler().compile(self.fold_code(source_code))
+    
+    def test_fold_arithmetic(self):
+        """Test folding of arithmetic on literals"""
+        instructions, constants = self.compile_code("2 + 3 * 4")
+        self.assertEqual(len(instructions), 2)
+        self.assertEqual(instructions[0][0], LOAD_CONST)
+        self.assertEqual(constants[instructions[0][1]], 14)
+        
+        # Nested expressions fold bottom-up
+        instructions, constants = self.compile_code("(10 - 4) / 3")
+        self.assertEqual(len(instructions), 2)
+        self.assertEqual(constants[instructions[0][1]], 2.0)
+        
+        # String concatenation
+        instructions, constants = self.compile_code('"foo" + "bar"')
+        self.assertEqual(len(instructions), 2)
+        self.assertEqual(constants[instructions[0][1]], "foobar")
+    
+    def test_fold_comparisons_and_logic(self):
+        """Test folding of comparisons, logical and unary operations"""
+        instructions, constants = self.compile_code("3 < 5 and not False")
+        self.assertEqual(instructions[0][0], LOAD_TRUE)
+        self.assertEqual(len(instructions), 2)
+        
+        instructions, constants = self.compile_code("-(2 + 3)")
+        self.assertEqual(len(instructions), 2)
+        self.assertEqual(constants[instructions[0][1]], -5)
+    
+    def test_partial_folding(self):
+        """Test that only the literal parts of an expression are folded"""
+        instructions, constants = self.compile_code("let x = 1\nx + 2 * 3")
+        self.assertEqual(instructions[-2][0], BINARY_CONST)
+        self.assertEqual(instructions[-2][1], ADD)
+        self.assertEqual(constants[instructions[-2][2]], 6)
+    
+    def test_runtime_errors_not_folded(self):
+        """Test that operations which fail at runtime are left for the VM"""
+        ast = self.fold_code("1 / 0")
+        self.assertIsInstance(ast.statements[0], BinOp)
+        
+        ast = self.fold_code('"a" - 1')
+        self.assertIsInstance(ast.statements[0], BinOp)
+    
+    def test_fold_if_with_literal_condition(self):
+        """Test that if statements with a literal condition keep only the taken branch"""
+        ast = self.fold_code("if (1 < 2) { 10 } else { 20 }")
+        self.assertIsInstance(ast.statements[0], Block)
+        self.assertEqual(ast.statements[0].statements[0].value, 10)
+        
+        ast = self.fold_code("if (False) { 10 }")
+        self.assertEqual(ast.statements[0].statements, [])
+    
+    def test_folded_program_result(self):
+        """Test that folding does not change a program's result"""
+        code = """
+        func area(r) {
+            return 3 * 2 * r * r
+        }
+        let total = 0
+        for (let i = 1 to 2 + 2) {
+            if (10 % 3 == 1) {
+                total assign total + area(i)
+            }
+        }
+        total
+        """
+        instructions, constants = self.compile_code(code)
+        self.assertEqual(BytecodeVM().run_program(instructions, constants), 180)
+    
+    def test_constants_deduplicated_by_type(self):
+        """Test that equal constants of different types get separate entries"""
+        instructions, constants = BytecodeCompiler().compile(self.fold_code("[1, 1.0, 1]"))
+        self.assertEqual(instructions[0][1], instructions[2][1])
+        self.assertNotEqual(instructions[0][1], instructions[1][1])
+        self.assertIsInstance(constants[instructions[1][1]], float)
+        
+        # -0.0 equals 0.0 but keeps its own entry, so the sign is not lost
+        instructions, constants = BytecodeCompiler().compile(self.fold_code("[0.0, -0.0, 0.0]"))
+        self.assertEqual(instructions[0][1], instructions[2][1])
+        self.assertNotEqual(instructions[0][1], instructions[1][1])
+        self.assertEqual(math.copysign(1.0, constants[instructions[1][1]]), -1.0)
+
+if __name__ == '__main__':
+    unittest.main()
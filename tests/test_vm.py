@@ -458,5 +458,98 @@ class TestVM(unittest.TestCase):
         # Check that the correct string was printed
         self.assertEqual(mock_stdout.getvalue().strip(), "Hello, World!")
 
+    @patch('sys.stdout', new_callable=io.StringIO)
+    def test_binary_operation_errors(self, mock_stdout):
+        """Test that binary operation handlers report runtime errors"""
+        # Division by zero
+        instructions = [
+            (LOAD_CONST, 0),  # Push 6
+            (LOAD_CONST, 1),  # Push 0
+            (DIVIDE, 0),      # Divide
+            (RETURN, 0)       # Return
+        ]
+        constants = [6, 0]
+        self.assertIsNone(self.vm.run_program(instructions, constants))
+        self.assertIn("Runtime Error: Division by zero", mock_stdout.getvalue())
+        
+        # Mismatched operand types
+        instructions = [
+            (LOAD_CONST, 0),  # Push "a"
+            (LOAD_CONST, 1),  # Push 1
+            (SUBTRACT, 0),    # Subtract
+            (RETURN, 0)       # Return
+        ]
+        constants = ["a", 1]
+        self.assertIsNone(self.vm.run_program(instructions, constants))
+        self.assertIn("Runtime Error: Cannot subtract 1 from a", mock_stdout.getvalue())
+    
+    @patch('sys.stdout', new_callable=io.StringIO)
+    def test_array_index_type(self, mock_stdout):
+        """Test that array indices must be integers, excluding booleans"""
+        instructions = [
+            (LOAD_CONST, 0),   # Push 10
+            (LOAD_CONST, 1),   # Push 20
+            (BUILD_ARRAY, 2),  # Build [10, 20]
+            (LOAD_CONST, 2),   # Push 1
+            (ARRAY_ACCESS,),   # Access index 1
+            (RETURN, 0)        # Return
+        ]
+        self.assertEqual(self.vm.run_program(instructions, [10, 20, 1]), 20)
+        
+        self.assertIsNone(self.vm.run_program(instructions, [10, 20, True]))
+        self.assertIn("Runtime Error: Array index must be an integer", mock_stdout.getvalue())
+
+    @patch('src.bytecode.vm.MAX_CALL_DEPTH', 50)
+    @patch('sys.stdout', new_callable=io.StringIO)
+    def test_call_depth_limit(self, mock_stdout):
+        """Test that unbounded recursion stops with a runtime error"""
+        func_code = [
+            (LOAD_VAR, "forever"),  # Push the function itself
+            (CALL_FUNC, 0),         # Call it again
+            (RETURN, 0)             # Return its result
+        ]
+        instructions = [
+            (DEFINE_FUNC, "forever", 0),  # Define the function
+            (LOAD_VAR, "forever"),        # Push the function
+            (CALL_FUNC, 0),               # Call it
+            (HALT,)
+        ]
+        constants = [{'name': 'forever', 'params': [], 'code': func_code, 'consts': []}]
+        self.assertIsNone(self.vm.run_program(instructions, constants))
+        self.assertIn("Runtime Error: Maximum call depth of 50 exceeded", mock_stdout.getvalue())
+
+    def test_halt_in_function(self):
+        """Test that HALT inside a function stops the program and restores the base frame"""
+        func_code = [
+            (LOAD_CONST, 0),  # Push 7
+            (HALT,)           # Stop the program
+        ]
+        instructions = [
+            (DEFINE_FUNC, "stop", 1),  # Define the function
+            (LOAD_VAR, "stop"),        # Push the function
+            (CALL_FUNC, 0),            # Call it
+            (LOAD_CONST, 0),           # Not reached
+            (HALT,)
+        ]
+        constants = [7, {'name': 'stop', 'params': [], 'code': func_code, 'consts': [7]}]
+        self.assertEqual(self.vm.run_program(instructions, constants), 7)
+        self.assertIs(self.vm.current_frame, self.vm.global_frame)
+
+    def test_decode_instructions(self):
+        """Test decoding of instructions into parallel opcode and operand arrays"""
+        instructions = [
+            (LOAD_CONST, 0),           # Single operand
+            (DEFINE_FUNC, "add", 1),   # Multiple operands
+            (HALT,)                    # No operands
+        ]
+        ops, args = self.vm._decode(instructions)
+        self.assertEqual(ops, [LOAD_CONST, DEFINE_FUNC, HALT])
+        self.assertEqual(args, [0, ("add", 1), None])
+
+        # Decoding the same instruction list again reuses the cached arrays
+        cached_ops, cached_args = self.vm._decode(instructions)
+        self.assertIs(cached_ops, ops)
+        self.assertIs(cached_args, args)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file